@@ -0,0 +1,104 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from benchmarks import scenarios
+from benchmarks.seed import DEFAULTS, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет отдельную тестовую БД данными заданного объема, "
+        "замеряет основные пути API и проверяет бюджеты SQL-запросов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="Множитель объема данных (1.0 - 100k пользователей, "
+            "5k курсов, 500k уроков, 1M подписок).",
+        )
+        for option, value in DEFAULTS.items():
+            parser.add_argument(f"--{option.replace('_', '-')}", type=int)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            help="Запустить только указанные сценарии.",
+        )
+        parser.add_argument("--output", help="Файл для JSON-результатов.")
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Не удалять БД после прогона и не заполнять ее повторно.",
+        )
+
+    def handle(self, *args, **options):
+        # Масштабируется число пользователей и курсов, плотность данных
+        # (уроков на курс, подписок на пользователя) остается прежней.
+        sizes = dict(DEFAULTS)
+        for option in ("users", "courses"):
+            sizes[option] = max(1, int(DEFAULTS[option] * options["scale"]))
+        for option in DEFAULTS:
+            if options[option]:
+                sizes[option] = options[option]
+
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity=0,
+            interactive=False,
+            keepdb=options["keepdb"],
+            aliases={"default"},
+        )
+        try:
+            report = self.run(sizes, options)
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+        over_budget = [
+            result["name"]
+            for result in report["scenarios"]
+            if not result["within_budget"]
+        ]
+        if over_budget:
+            raise CommandError("Query budget exceeded: " + ", ".join(over_budget))
+
+    def run(self, sizes, options):
+        from courses.models import Course
+
+        started = time.perf_counter()
+        if options["keepdb"] and Course.objects.exists():
+            data = {"reused": True}
+        else:
+            data = seed(
+                **sizes, log=lambda message: self.stderr.write(f"seeded {message}")
+            )
+        seed_seconds = time.perf_counter() - started
+
+        return {
+            "database": connection.vendor,
+            "data": {**sizes, **data},
+            "seed_seconds": round(seed_seconds, 2),
+            "scenarios": scenarios.run(
+                repeat=options["repeat"], names=options["scenarios"]
+            ),
+        }
@@ -0,0 +1,220 @@
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.db.models import Max, Q
+
+from courses.models import Group
+from product.db import batches
+
+# Порядок копирования: родительские таблицы раньше зависимых.
+MODELS = (
+    "users.CustomUser",
+    "courses.Course",
+    "users.Balance",
+    "users.BalanceTransaction",
+    "users.Subscription",
+    "courses.Lesson",
+    "courses.Group",
+)
+# Таблицы, строки которых не изменяются после вставки.
+APPEND_ONLY = ("users.BalanceTransaction", "courses.Group_students")
+
+
+class Command(BaseCommand):
+    help = (
+        "Потоково копирует пользователей, балансы, курсы, уроки, группы "
+        "и подписки из одной БД в другую."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default="default")
+        parser.add_argument("--target", default="target")
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument(
+            "--no-migrate",
+            action="store_true",
+            help="Не применять миграции к БД назначения.",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help=(
+                "Дополнить ранее скопированную БД: удалить исчезнувшие "
+                "строки, скопировать новые и измененные. Таблицы без "
+                "updated_at копируются целиком."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        source, target = options["source"], options["target"]
+        if source == target:
+            raise CommandError("Source and target must differ.")
+        if not options["no_migrate"]:
+            call_command("migrate", database=target, verbosity=0)
+
+        models = [apps.get_model(label) for label in MODELS]
+        models.append(Group.students.through)
+        if not options["incremental"]:
+            for model in models:
+                if model._default_manager.using(target).exists():
+                    raise CommandError(
+                        f"Target table {model._meta.db_table} is not empty; "
+                        "use --incremental."
+                    )
+
+        if options["incremental"]:
+            # Сначала зависимые таблицы: удаление не упирается во внешние
+            # ключи, а переставленные участники групп не нарушают
+            # уникальность при повторной вставке.
+            for model in reversed(models):
+                deleted = self.delete_missing(
+                    model, source, target, options["chunk_size"]
+                )
+                if deleted:
+                    self.stdout.write(
+                        f"{model._meta.db_table}: {deleted} deleted"
+                    )
+
+        for model in models:
+            copied = self.copy_model(
+                model, source, target, options["chunk_size"],
+                options["incremental"],
+            )
+            self.stdout.write(f"{model._meta.db_table}: {copied}")
+
+        connection = connections[target]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+
+        for model in models:
+            expected = model._default_manager.using(source).count()
+            copied = model._default_manager.using(target).count()
+            if expected != copied:
+                raise CommandError(
+                    f"{model._meta.db_table}: {expected} rows in source, "
+                    f"{copied} in target."
+                )
+        self.stdout.write(self.style.SUCCESS("Database copied."))
+
+    def copy_model(self, model, source, target, chunk_size, incremental):
+        fields = model._meta.concrete_fields
+        queryset = model._default_manager.using(source).order_by("pk")
+        if incremental:
+            queryset = queryset.filter(
+                self.changed_rows(model, target)
+            ).distinct()
+        # iterator() читает сервер-side курсором пачками, не загружая
+        # таблицу в память.
+        rows = queryset.values_list(
+            *(field.attname for field in fields)
+        ).iterator(chunk_size=chunk_size)
+
+        copied = 0
+        for chunk in batches(rows, chunk_size):
+            with transaction.atomic(using=target):
+                self.write(model, target, chunk, upsert=incremental)
+            copied += len(chunk)
+        return copied
+
+    def delete_missing(self, model, source, target, chunk_size):
+        """Удаление из БД назначения строк, которых нет в источнике."""
+        pks = (
+            model._default_manager.using(target)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+            .iterator(chunk_size=chunk_size)
+        )
+        missing = []
+        for chunk in batches(pks, chunk_size):
+            present = set(
+                model._default_manager.using(source)
+                .filter(pk__in=chunk)
+                .values_list("pk", flat=True)
+            )
+            missing.extend(pk for pk in chunk if pk not in present)
+
+        # Прямой DELETE: удаление через ORM отправило бы сигналы,
+        # которые меняют счетчики в БД по умолчанию.
+        connection = connections[target]
+        table = connection.ops.quote_name(model._meta.db_table)
+        pk = connection.ops.quote_name(model._meta.pk.column)
+        with connection.cursor() as cursor:
+            for chunk in batches(missing, chunk_size):
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE {pk} IN "
+                    f"({', '.join(['%s'] * len(chunk))})",
+                    chunk,
+                )
+        return len(missing)
+
+    def changed_rows(self, model, target):
+        """Условие на строки, которых еще нет в БД назначения."""
+        field_names = {field.name for field in model._meta.concrete_fields}
+        if (
+            "updated_at" not in field_names
+            and model._meta.label not in APPEND_ONLY
+            and model._meta.label != "users.Balance"
+        ):
+            # Изменение строки не отследить: копируется вся таблица.
+            return Q()
+        manager = model._default_manager.using(target)
+        condition = Q(pk__gt=manager.aggregate(last=Max("pk"))["last"] or 0)
+        if "updated_at" in field_names:
+            updated = manager.aggregate(last=Max("updated_at"))["last"]
+            if updated is not None:
+                condition |= Q(updated_at__gt=updated)
+        if model._meta.label == "users.Balance":
+            # Снимок баланса меняется вместе с журналом операций.
+            last_transaction = apps.get_model(
+                "users", "BalanceTransaction"
+            )._default_manager.using(target).aggregate(last=Max("pk"))["last"]
+            condition |= Q(
+                user__balance_transactions__pk__gt=last_transaction or 0
+            )
+        return condition
+
+    def write(self, model, target, rows, upsert):
+        connection = connections[target]
+        fields = model._meta.concrete_fields
+        table = connection.ops.quote_name(model._meta.db_table)
+        columns = [connection.ops.quote_name(field.column) for field in fields]
+
+        with connection.cursor() as cursor:
+            raw_cursor = cursor.cursor
+            if (
+                not upsert
+                and connection.vendor == "postgresql"
+                and hasattr(raw_cursor, "copy")
+            ):
+                # psycopg 3: загрузка через COPY ... FROM STDIN.
+                with raw_cursor.copy(
+                    f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+                ) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                return
+
+            sql = (
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join(['%s'] * len(columns))})"
+            )
+            if upsert:
+                pk = connection.ops.quote_name(model._meta.pk.column)
+                updates = ", ".join(
+                    f"{column} = EXCLUDED.{column}"
+                    for column in columns if column != pk
+                )
+                sql += f" ON CONFLICT ({pk}) DO UPDATE SET {updates}"
+            cursor.executemany(
+                sql,
+                [
+                    [
+                        field.get_db_prep_save(value, connection)
+                        for field, value in zip(fields, row)
+                    ]
+                    for row in rows
+                ],
+            )
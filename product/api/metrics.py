@@ -0,0 +1,60 @@
+import threading
+from collections import defaultdict, deque
+
+# Для перцентилей хранится только последнее окно замеров маршрута.
+WINDOW_SIZE = 1000
+
+
+def percentile(values, fraction):
+    """Перцентиль по уже отсортированному списку."""
+    if not values:
+        return 0
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+class RouteMetrics:
+    """Замеры запросов по маршрутам в памяти процесса."""
+
+    def __init__(self, window_size=WINDOW_SIZE):
+        self._lock = threading.Lock()
+        self._durations = defaultdict(lambda: deque(maxlen=window_size))
+        self._queries = defaultdict(lambda: deque(maxlen=window_size))
+        self._counts = defaultdict(int)
+
+    def record(self, route, duration, queries):
+        with self._lock:
+            self._durations[route].append(duration)
+            self._queries[route].append(queries)
+            self._counts[route] += 1
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._queries.clear()
+            self._counts.clear()
+
+    def summary(self):
+        with self._lock:
+            snapshot = {
+                route: (
+                    sorted(self._durations[route]),
+                    list(self._queries[route]),
+                    self._counts[route],
+                )
+                for route in self._counts
+            }
+        return {
+            route: {
+                "requests": count,
+                "p50_ms": round(percentile(durations, 0.50), 2),
+                "p95_ms": round(percentile(durations, 0.95), 2),
+                "p99_ms": round(percentile(durations, 0.99), 2),
+                "avg_queries": round(sum(queries) / len(queries), 2),
+                "max_queries": max(queries),
+            }
+            for route, (durations, queries, count) in sorted(snapshot.items())
+        }
+
+
+route_metrics = RouteMetrics()
@@ -0,0 +1,110 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from api.metrics import route_metrics
+
+logger = logging.getLogger("api.metrics")
+
+ROUTE_GROUP = re.compile(r"\(\?P<(\w+)>[^)]*\)")
+
+
+def route_name(request):
+    """Шаблон маршрута запроса: GET /api/v1/courses/{pk}/."""
+    match = request.resolver_match
+    if match is None:
+        return f"{request.method} {request.path}"
+    route = ROUTE_GROUP.sub(r"{\1}", match.route).replace("^", "").replace("$", "")
+    return f"{request.method} /{route}"
+
+
+class QueryRecorder:
+    """Счетчик SQL-запросов и времени БД для одного HTTP-запроса."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            # Текст запроса без параметров: повторы с разными значениями
+            # и есть признак N+1.
+            self.fingerprints[sql] += 1
+
+    def duplicates(self, limit=5):
+        return {
+            sql: count
+            for sql, count in self.fingerprints.most_common(limit)
+            if count > 1
+        }
+
+
+class QueryMetricsMiddleware:
+    """Замеры SQL и времени обработки запросов к API.
+
+    Включается настройкой API_METRICS_ENABLED. Отдает заголовок
+    Server-Timing, пишет строку в лог ``api.metrics`` и копит
+    перцентили по маршрутам для /api/v1/metrics/.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "API_METRICS_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        request._metrics_render = 0.0
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        route = route_name(request)
+        render = request._metrics_render
+        app = max(total - recorder.duration - render, 0)
+        response["Server-Timing"] = ", ".join((
+            f'db;dur={recorder.duration * 1000:.2f};'
+            f'desc="{recorder.count} queries"',
+            f"app;dur={app * 1000:.2f}",
+            f"render;dur={render * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}",
+        ))
+        route_metrics.record(route, total * 1000, recorder.count)
+        logger.info(json.dumps({
+            "route": route,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 2),
+            "db_ms": round(recorder.duration * 1000, 2),
+            "app_ms": round(app * 1000, 2),
+            "render_ms": round(render * 1000, 2),
+            "queries": recorder.count,
+            "duplicate_queries": recorder.duplicates(),
+        }, ensure_ascii=False))
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF Response рендерится сразу после этого хука: время до
+        # post-render callback - это время сериализации в JSON.
+        started = time.perf_counter()
+
+        def rendered(response):
+            request._metrics_render = time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import (
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_migrate,
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.v1.authentication import token_cache
+from product.db import finish_migration, start_migration
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Удаленный токен (выход через token/logout) больше не принимается."""
+
+    token_cache.evict_keys(instance.key)
+
+
+@receiver(user_logged_out)
+def user_logged_out_handler(sender, user, **kwargs):
+    if user is not None:
+        token_cache.evict_users(user.pk)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, **kwargs):
+    """Деактивация и смена прав действуют со следующего запроса."""
+
+    token_cache.evict_users(instance.pk)
+
+
+pre_migrate.connect(start_migration)
+post_migrate.connect(finish_migration)
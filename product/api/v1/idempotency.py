@@ -0,0 +1,51 @@
+from functools import wraps
+
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_TTL = 60 * 60 * 24
+IN_PROGRESS_TTL = 60
+IN_PROGRESS = "in-progress"
+
+
+def idempotent(method):
+    """Повторный запрос с тем же Idempotency-Key получает сохраненный ответ.
+
+    Ключ действует в пределах пользователя и адреса запроса, поэтому
+    повтор оплаты клиентом не приводит к повторному списанию.
+    """
+
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return method(self, request, *args, **kwargs)
+
+        cache_key = f"idempotency:{request.user.pk}:{request.path}:{key}"
+        if not cache.add(cache_key, IN_PROGRESS, IN_PROGRESS_TTL):
+            cached = cache.get(cache_key)
+            if cached is None or cached == IN_PROGRESS:
+                return Response(
+                    {"error": "A request with this key is in progress."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            return Response(cached["data"], status=cached["status"])
+
+        try:
+            response = method(self, request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+        if status.is_server_error(response.status_code):
+            cache.delete(cache_key)
+        else:
+            cache.set(
+                cache_key,
+                {"data": response.data, "status": response.status_code},
+                IDEMPOTENCY_TTL,
+            )
+        return response
+
+    return wrapper
@@ -0,0 +1,120 @@
+import hashlib
+
+from django.db.models import CharField, Count, DateTimeField, Max, Value
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.permissions import SAFE_METHODS
+
+
+def collection_state(*parts):
+    """Валидатор списка по нескольким таблицам одним запросом UNION ALL.
+
+    ``parts`` - тройки (метка, queryset, поле даты изменения) или
+    четверки с агрегатом-версией вместо количества строк по умолчанию.
+    Поле даты может быть None, если достаточно версии.
+    """
+    first, *rest = (
+        queryset.order_by()
+        .annotate(label=Value(label, output_field=CharField()))
+        .values("label")
+        .annotate(
+            updated=(
+                Max(field) if field
+                else Value(None, output_field=DateTimeField())
+            ),
+            version=version,
+        )
+        .values_list("label", "updated", "version")
+        for label, queryset, field, version in (
+            part if len(part) == 4 else (*part, Count("pk")) for part in parts
+        )
+    )
+    return sorted(first.union(*rest, all=True) if rest else first)
+
+
+class SparseFieldsMixin:
+    """Ограничение полей ответа параметром ``?fields=a,b``.
+
+    Невыбранные поля убираются из сериализатора, а столбцы модели,
+    которые не нужны ни ответу, ни сортировке, - из SQL через only().
+    """
+
+    fields_query_param = "fields"
+    # Столбцы модели, которые читают вычисляемые поля сериализатора.
+    sparse_field_columns = {}
+
+    def get_requested_fields(self):
+        value = self.request.query_params.get(self.fields_query_param)
+        if not value:
+            return None
+        return {name.strip() for name in value.split(",") if name.strip()}
+
+    def is_field_requested(self, name):
+        requested = self.get_requested_fields()
+        return requested is None or name in requested
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        requested = self.get_requested_fields()
+        if requested is not None and self.request.method in SAFE_METHODS:
+            fields = getattr(serializer, "child", serializer).fields
+            for name in set(fields) - requested:
+                fields.pop(name)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        requested = self.get_requested_fields()
+        if requested is None or self.request.method not in SAFE_METHODS:
+            return queryset
+        opts = queryset.model._meta
+        columns = requested & {field.name for field in opts.concrete_fields}
+        for name in requested:
+            columns.update(self.sparse_field_columns.get(name, ()))
+        columns.add(opts.pk.name)
+        columns.update(name.lstrip("-") for name in opts.ordering)
+        if isinstance(queryset.query.select_related, dict):
+            columns.update(queryset.query.select_related)
+        return queryset.only(*columns)
+
+
+class ConditionalListMixin:
+    """Условный GET для списков: ETag и Last-Modified.
+
+    Валидаторы строятся по ``get_list_state()`` одним агрегатным
+    запросом; если данные не менялись, ответ 304 отдается без
+    сериализации.
+    """
+
+    conditional_actions = ("list",)
+    list_state_field = "updated_at"
+
+    def get_list_state(self):
+        """Последнее изменение и количество строк самого списка."""
+        return collection_state(
+            ("list", self.get_queryset(), self.list_state_field)
+        )
+
+    def list(self, request, *args, **kwargs):
+        if self.action not in self.conditional_actions:
+            return super().list(request, *args, **kwargs)
+
+        state = self.get_list_state()
+        etag = quote_etag(
+            hashlib.md5(
+                repr((state, request.get_full_path())).encode()
+            ).hexdigest()
+        )
+        updated = [row[1] for row in state if row[1] is not None]
+        last_modified = int(max(updated).timestamp()) if updated else None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        return response
@@ -0,0 +1,15 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ModelOrderingCursorPagination(CursorPagination):
+    """Курсорная пагинация по сортировке из Meta модели.
+
+    Следующая страница выбирается условием по ключу сортировки,
+    без OFFSET и COUNT, поэтому время ответа не растет с таблицей.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(queryset.model._meta.ordering) or ("-pk",)
@@ -1,36 +1,120 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from rest_framework.permissions import BasePermission, SAFE_METHODS
-from users.models import Subscription, Balance
+from users.models import Balance, BalanceTransaction, Subscription
 from courses.models import Course
+from courses.services import assign_groups
+from users.dashboard import invalidate_students
+from users.entitlements import get_course_ids, invalidate_entitlements
+from users.purchases import debit_course
 from rest_framework.exceptions import ValidationError
 
+from product.db import retry_on_lock
+
+
+@retry_on_lock
+def purchase_course(user, course):
+    """Атомарная покупка курса: списание бонусов и создание подписки."""
+    try:
+        with transaction.atomic():
+            debit_course(user, course)
+
+            # Создание подписки в той же транзакции
+            return Subscription.objects.create(user=user, course=course)
+    except IntegrityError:
+        raise ValidationError("The course has already been purchased.")
+
+
+@retry_on_lock
+def purchase_courses(user, course_ids):
+    """Покупка корзины курсов одним списанием.
+
+    Сумма корзины списывается одним условным UPDATE, операции журнала
+    и подписки создаются через bulk_create, студент зачисляется в группы
+    всех курсов за один проход. Количество запросов не зависит от
+    размера корзины.
+    """
+    course_ids = list(dict.fromkeys(course_ids))
+    try:
+        with transaction.atomic():
+            # Цены читаются в транзакции списания, чтобы изменение цены
+            # между чтением и списанием не приводило к списанию старой.
+            prices = dict(
+                Course.objects.select_for_update()
+                .filter(pk__in=course_ids, available=True)
+                .values_list("pk", "price")
+            )
+            unavailable = [pk for pk in course_ids if pk not in prices]
+            if unavailable:
+                raise ValidationError(
+                    f"Courses not found or not available: {unavailable}."
+                )
+            total = sum(prices.values())
+
+            debited = Balance.objects.filter(
+                user=user, amount__gte=total
+            ).update(amount=F("amount") - total)
+            if not debited:
+                raise ValidationError(
+                    "Insufficient balance to purchase the courses."
+                )
+
+            BalanceTransaction.objects.bulk_create(
+                BalanceTransaction(
+                    user=user,
+                    kind=BalanceTransaction.PURCHASE,
+                    amount=-prices[course_id],
+                    course_id=course_id,
+                )
+                for course_id in course_ids
+            )
+            # bulk_create не отправляет post_save, поэтому зачисление
+            # в группы выполняется здесь же, сразу для всех курсов.
+            subscriptions = Subscription.objects.bulk_create(
+                Subscription(user=user, course_id=course_id)
+                for course_id in course_ids
+            )
+            assign_groups(user.pk, course_ids)
+            invalidate_students(user.pk)
+            invalidate_entitlements(user.pk)
+            return subscriptions
+    except IntegrityError:
+        raise ValidationError(
+            "One of the courses has already been purchased."
+        )
+
 
 def make_payment(request, course_id):
-    user = request.user
     course = Course.objects.get(id=course_id)
+    return purchase_course(request.user, course)
 
-    # Проверка баланса пользователя
-    balance = Balance.objects.get(user=user)
-    if balance.amount < course.price:
-        raise ValidationError("Insufficient balance to purchase the course.")
 
-    # Списание бонусов с баланса пользователя
-    balance.amount -= course.price
-    balance.save()
+def has_course_access(request, course_id):
+    """Куплен ли курс пользователем запроса.
 
-    # Создание подписки
-    subscription = Subscription.objects.create(user=user, course=course)
-
-    return subscription
+    Множество курсов берется из кеша один раз на запрос.
+    """
+    if not hasattr(request, "_course_ids"):
+        request._course_ids = get_course_ids(request.user.pk)
+    return int(course_id) in request._course_ids
 
 
 class IsStudentOrIsAdmin(BasePermission):
+    """Чтение уроков курса - студентам, купившим курс; запись - админам."""
+
     def has_permission(self, request, view):
-        return request.user.is_authenticated and (
-            request.user.is_staff or request.method in SAFE_METHODS
+        if not request.user.is_authenticated:
+            return False
+        if request.user.is_staff:
+            return True
+        return request.method in SAFE_METHODS and has_course_access(
+            request, view.kwargs["course_id"]
         )
 
     def has_object_permission(self, request, view, obj):
-        return request.user.is_staff or obj.user == request.user
+        return request.user.is_staff or has_course_access(
+            request, obj.course_id
+        )
 
 
 class ReadOnlyOrIsAdmin(BasePermission):
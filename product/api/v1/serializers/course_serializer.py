@@ -1,11 +1,14 @@
 from django.contrib.auth import get_user_model
+from django.db import models
 from rest_framework import serializers
 
-from courses.models import Course, Group, Lesson
-from users.models import Subscription
+from courses.models import GROUP_MAX_STUDENTS, Course, Group, Lesson
+from courses.statistics import get_course_statistics
 
 User = get_user_model()
 
+STATISTICS_SERIALIZER_FIELDS = {"groups_filled_percent"}
+
 
 class LessonSerializer(serializers.ModelSerializer):
     """Список уроков."""
@@ -64,19 +67,51 @@ class MiniLessonSerializer(serializers.ModelSerializer):
         fields = ("title",)
 
 
+def attach_statistics(courses):
+    """Подстановка закешированной статистики в объекты курсов."""
+    courses = [
+        course for course in courses
+        if not hasattr(course, "groups_count")
+    ]
+    if not courses:
+        return
+    statistics = get_course_statistics([course.pk for course in courses])
+    for course in courses:
+        for field, value in statistics.get(course.pk, {}).items():
+            setattr(course, field, value)
+
+
+class CourseListSerializer(serializers.ListSerializer):
+    """Список курсов со статистикой, загруженной одной пачкой."""
+
+    def to_representation(self, data):
+        courses = list(
+            data.all() if isinstance(data, models.manager.BaseManager)
+            else data
+        )
+        if STATISTICS_SERIALIZER_FIELDS & set(self.child.fields):
+            attach_statistics(courses)
+        return super().to_representation(courses)
+
+
 class CourseSerializer(serializers.ModelSerializer):
-    """Список курсов."""
+    """Список курсов.
+
+    Количество уроков и студентов хранится в курсе, статистика групп
+    берется из кеша ``courses.statistics``, а общее количество
+    пользователей - из контекста под ключом ``users_count``.
+    """
 
     lessons = MiniLessonSerializer(
         many=True,
         read_only=True
     )
 
-    lessons_count = serializers.SerializerMethodField(
+    lessons_count = serializers.IntegerField(
         read_only=True
     )
 
-    students_count = serializers.SerializerMethodField(
+    students_count = serializers.IntegerField(
         read_only=True
     )
 
@@ -88,27 +123,26 @@ class CourseSerializer(serializers.ModelSerializer):
         read_only=True
     )
 
-    def get_lessons_count(self, obj):
-        """Количество уроков в курсе."""
-        return obj.lessons.count()
-
-    def get_students_count(self, obj):
-        """Общее количество студентов на курсе."""
-        return Subscription.objects.filter(course=obj).count()
+    def to_representation(self, instance):
+        if STATISTICS_SERIALIZER_FIELDS & set(self.fields):
+            attach_statistics([instance])
+        return super().to_representation(instance)
 
     def get_groups_filled_percent(self, obj):
         """Процент заполнения групп, если в группе максимум 30 чел."""
-        groups = obj.groups.all()
-        if not groups:
+        if not obj.groups_count:
             return 0
-        total_students = sum(group.students.count() for group in groups)
-        return (total_students / (len(groups) * 30)) * 100
+        return (
+            obj.groups_students_count
+            / (obj.groups_count * GROUP_MAX_STUDENTS)
+        ) * 100
 
     def get_demand_course_percent(self, obj):
         """Процент приобретения курса."""
-        total_subscriptions = Subscription.objects.filter(course=obj).count()
-        total_users = User.objects.count()
-        return (total_subscriptions / total_users) * 100 if total_users else 0
+        if "users_count" not in self.context:
+            self.context["users_count"] = User.objects.count()
+        total_users = self.context["users_count"]
+        return (obj.students_count / total_users) * 100 if total_users else 0
 
     class Meta:
         model = Course
@@ -124,6 +158,44 @@ class CourseSerializer(serializers.ModelSerializer):
             "students_count",
             "groups_filled_percent",
         )
+        list_serializer_class = CourseListSerializer
+
+
+class AvailableCourseSerializer(serializers.ModelSerializer):
+    """Список курсов, доступных для покупки."""
+
+    lessons_count = serializers.IntegerField(
+        read_only=True
+    )
+
+    class Meta:
+        model = Course
+        fields = (
+            "id",
+            "author",
+            "title",
+            "start_date",
+            "price",
+            "lessons_count",
+        )
+
+
+class CourseSearchSerializer(serializers.ModelSerializer):
+    """Курс в результатах поиска."""
+
+    class Meta:
+        model = Course
+        fields = ("id", "title", "author", "start_date", "price")
+
+
+class LessonSearchSerializer(serializers.ModelSerializer):
+    """Урок в результатах поиска."""
+
+    course_title = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Lesson
+        fields = ("id", "title", "link", "course_id", "course_title")
 
 
 class CreateCourseSerializer(serializers.ModelSerializer):
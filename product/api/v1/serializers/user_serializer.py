@@ -1,10 +1,13 @@
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
-from rest_framework.exceptions import ValidationError
 
-from users.models import Subscription, Balance
-from courses.models import Course
+from api.v1.permissions import purchase_course
+from courses.models import Course, Group, Lesson
+from users.models import Purchase, Subscription
+from users.services import provision_user
 
 User = get_user_model()
 
@@ -27,7 +30,7 @@ class CustomUserSerializer(UserSerializer):
         }
 
     def create(self, validated_data):
-        user = User.objects.create_user(
+        user = provision_user(
             username=validated_data["username"],
             email=validated_data["email"],
             password=validated_data["password"],
@@ -41,29 +44,96 @@ class SubscriptionSerializer(serializers.ModelSerializer):
     """Сериализатор подписки."""
 
     def create(self, validated_data):
-        user = validated_data["user"]
-        course = validated_data["course"]
-
-        # Проверка баланса пользователя
-        balance = Balance.objects.get(user=user)
-        if balance.amount < course.price:
-            raise ValidationError(
-                "Insufficient balance to purchase the course."
-            )
-
-        # Списание бонусов с баланса пользователя
-        balance.amount -= course.price
-        balance.save()
-
-        # Создание подписки
-        subscription = Subscription.objects.create(
-            user=user,
-            course=course
+        return purchase_course(
+            validated_data["user"],
+            validated_data["course"]
         )
 
-        return subscription
-
     class Meta:
         model = Subscription
         fields = ("id", "user", "course", "subscribed_at")
         read_only_fields = ("id", "subscribed_at")
+
+
+class PurchaseSerializer(serializers.ModelSerializer):
+    """Сериализатор покупки из очереди."""
+
+    class Meta:
+        model = Purchase
+        fields = (
+            "id",
+            "course",
+            "amount",
+            "status",
+            "error",
+            "created_at",
+            "processed_at",
+        )
+        read_only_fields = fields
+
+
+class BalanceCreditSerializer(serializers.Serializer):
+    """Начисление бонусов пользователю."""
+
+    email = serializers.EmailField()
+    amount = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        min_value=Decimal("0.01")
+    )
+
+
+class CheckoutSerializer(serializers.Serializer):
+    """Корзина курсов для покупки."""
+
+    course_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=100
+    )
+
+
+class StudentCourseSerializer(serializers.ModelSerializer):
+    """Курс в списке курсов студента."""
+
+    class Meta:
+        model = Course
+        fields = ("id", "title", "author", "start_date")
+
+
+class StudentGroupSerializer(serializers.ModelSerializer):
+    """Группа студента на курсе."""
+
+    class Meta:
+        model = Group
+        fields = ("id", "title")
+
+
+class StudentLessonSerializer(serializers.ModelSerializer):
+    """Урок в списке курсов студента."""
+
+    class Meta:
+        model = Lesson
+        fields = ("id", "title")
+
+
+class StudentSubscriptionSerializer(serializers.ModelSerializer):
+    """Купленный курс студента с его группой и уроками.
+
+    Группы студента ожидаются в ``course.student_groups``
+    (Prefetch с to_attr), уроки - в ``course.lessons``.
+    """
+
+    course = StudentCourseSerializer(read_only=True)
+    group = serializers.SerializerMethodField()
+    lessons = StudentLessonSerializer(
+        source="course.lessons", many=True, read_only=True
+    )
+
+    def get_group(self, obj):
+        groups = obj.course.student_groups
+        return StudentGroupSerializer(groups[0]).data if groups else None
+
+    class Meta:
+        model = Subscription
+        fields = ("id", "subscribed_at", "course", "group", "lessons")
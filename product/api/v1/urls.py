@@ -6,12 +6,23 @@ from drf_spectacular.views import (
 )
 from rest_framework.routers import DefaultRouter
 
+from api.v1.views import async_view
+from api.v1.views.balance_view import BalanceViewSet
+from api.v1.views.checkout_view import CheckoutViewSet
 from api.v1.views.course_view import CourseViewSet, GroupViewSet, LessonViewSet
+from api.v1.views.export_view import ExportViewSet
+from api.v1.views.metrics_view import MetricsView
+from api.v1.views.purchase_view import PurchaseViewSet
+from api.v1.views.search_view import SearchView
 from api.v1.views.user_view import UserViewSet
 
 v1_router = DefaultRouter()
 v1_router.register("users", UserViewSet, basename="users")
 v1_router.register("courses", CourseViewSet, basename="courses")
+v1_router.register("balances", BalanceViewSet, basename="balances")
+v1_router.register("checkout", CheckoutViewSet, basename="checkout")
+v1_router.register("exports", ExportViewSet, basename="exports")
+v1_router.register("purchases", PurchaseViewSet, basename="purchases")
 v1_router.register(
     r"courses/(?P<course_id>\d+)/lessons", LessonViewSet, basename="lessons"
 )
@@ -21,6 +32,14 @@ v1_router.register(
 
 urlpatterns = [
     path("", include(v1_router.urls)),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+    path("search/", SearchView.as_view(), name="search"),
+    path("async/courses/", async_view.course_list, name="async-courses"),
+    path(
+        "async/courses/<int:course_id>/lessons/",
+        async_view.lesson_list,
+        name="async-lessons",
+    ),
     path("auth/", include("djoser.urls")),
     path("auth/", include("djoser.urls.authtoken")),
 ]
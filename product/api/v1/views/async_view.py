@@ -0,0 +1,160 @@
+"""
+Асинхронные представления каталога и уроков для работы под ASGI.
+
+Данные читаются асинхронным ORM в виде словарей, статистика - из кеша
+через aget_many, поэтому сериализаторы DRF получают готовые объекты
+и не обращаются к БД. Поддерживаются аутентификация по токену и сессии.
+"""
+
+import copy
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user, get_user_model
+from django.http import JsonResponse
+from rest_framework.authtoken.models import Token
+
+from api.v1.authentication import token_cache
+from api.v1.pagination import ModelOrderingCursorPagination
+from api.v1.serializers.course_serializer import (
+    CourseSerializer,
+    LessonSerializer,
+)
+from courses.models import Course, Lesson
+from courses.statistics import aget_course_statistics
+from users.entitlements import aget_course_ids
+
+User = get_user_model()
+
+COURSE_FIELDS = (
+    "id",
+    "author",
+    "title",
+    "start_date",
+    "price",
+    "lessons_count",
+    "students_count",
+)
+
+
+async def get_api_user(request):
+    """Активный пользователь запроса или None."""
+    keyword, _, key = request.headers.get("Authorization", "").partition(" ")
+    if keyword == "Token" and key:
+        cached = token_cache.get(key)
+        if cached is not None:
+            user = copy.copy(cached[0])
+        else:
+            token = await Token.objects.select_related("user").filter(
+                key=key
+            ).afirst()
+            user = token.user if token else None
+            if user is not None and user.is_active:
+                token_cache.set(key, user, token)
+    else:
+        user = await sync_to_async(get_user)(request)
+    return user if user is not None and user.is_active else None
+
+
+def unauthorized():
+    response = JsonResponse(
+        {"detail": "Authentication credentials were not provided."},
+        status=401,
+    )
+    response["WWW-Authenticate"] = "Token"
+    return response
+
+
+def get_page_size(request):
+    try:
+        size = int(request.GET["page_size"])
+    except (KeyError, ValueError):
+        return settings.REST_FRAMEWORK["PAGE_SIZE"]
+    return max(1, min(size, ModelOrderingCursorPagination.max_page_size))
+
+
+def get_key(request, param):
+    value = request.GET.get(param, "")
+    return int(value) if value.isdigit() else None
+
+
+def page_response(request, results, param, next_key):
+    """Страница в формате {"next", "results"}; next - ссылка по ключу."""
+    next_url = None
+    if next_key is not None:
+        query = request.GET.copy()
+        query[param] = next_key
+        next_url = request.build_absolute_uri(
+            f"{request.path}?{query.urlencode()}"
+        )
+    return JsonResponse({"next": next_url, "results": results})
+
+
+async def course_list(request):
+    """Каталог курсов: названия уроков, статистика и спрос.
+
+    Как и синхронный каталог, доступен анонимно; отклоняются только
+    неверные учетные данные.
+    """
+    if (
+        "Authorization" in request.headers
+        and await get_api_user(request) is None
+    ):
+        return unauthorized()
+
+    size = get_page_size(request)
+    courses = Course.objects.order_by("-id")
+    before = get_key(request, "before")
+    if before is not None:
+        courses = courses.filter(pk__lt=before)
+    rows = [
+        SimpleNamespace(**row, lessons=[])
+        async for row in courses.values(*COURSE_FIELDS)[: size + 1]
+    ]
+    next_key = rows[size - 1].id if len(rows) > size else None
+    rows = rows[:size]
+
+    by_id = {row.id: row for row in rows}
+    async for course_id, title in Lesson.objects.filter(
+        course_id__in=by_id
+    ).order_by("id").values_list("course_id", "title"):
+        by_id[course_id].lessons.append(SimpleNamespace(title=title))
+    statistics = await aget_course_statistics(list(by_id))
+    for row in rows:
+        vars(row).update(statistics[row.id])
+
+    serializer = CourseSerializer(
+        rows, many=True, context={"users_count": await User.objects.acount()}
+    )
+    return page_response(request, serializer.data, "before", next_key)
+
+
+async def lesson_list(request, course_id):
+    """Уроки курса для купивших его студентов и сотрудников."""
+    user = await get_api_user(request)
+    if user is None:
+        return unauthorized()
+    if not user.is_staff and course_id not in await aget_course_ids(user.pk):
+        return JsonResponse(
+            {"detail": "You do not have permission to perform this action."},
+            status=403,
+        )
+
+    course = await Course.objects.filter(pk=course_id).values("title").afirst()
+    if course is None:
+        return JsonResponse({"detail": "Not found."}, status=404)
+
+    size = get_page_size(request)
+    lessons = Lesson.objects.filter(course_id=course_id).order_by("id")
+    after = get_key(request, "after")
+    if after is not None:
+        lessons = lessons.filter(pk__gt=after)
+    rows = [
+        SimpleNamespace(**row, course=course["title"])
+        async for row in lessons.values("id", "title", "link")[: size + 1]
+    ]
+    next_key = rows[size - 1].id if len(rows) > size else None
+
+    serializer = LessonSerializer(rows[:size], many=True)
+    return page_response(request, serializer.data, "after", next_key)
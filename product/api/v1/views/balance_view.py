@@ -0,0 +1,45 @@
+import csv
+import io
+from collections import defaultdict
+from decimal import Decimal
+
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.response import Response
+
+from api.v1.serializers.user_serializer import BalanceCreditSerializer
+from users.services import bulk_credit
+
+
+class BalanceViewSet(viewsets.GenericViewSet):
+    """Балансы пользователей."""
+
+    permission_classes = (permissions.IsAdminUser,)
+    serializer_class = BalanceCreditSerializer
+
+    @action(
+        methods=["post"],
+        detail=False,
+        url_path="bulk-credit",
+        parser_classes=(JSONParser, MultiPartParser),
+    )
+    def bulk_credit(self, request):
+        """Начисление бонусов списком {email, amount} или CSV-файлом."""
+
+        if "file" in request.FILES:
+            data = list(
+                csv.DictReader(
+                    io.TextIOWrapper(request.FILES["file"], encoding="utf-8-sig")
+                )
+            )
+        else:
+            data = request.data
+        serializer = self.get_serializer(data=data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        amounts_by_email = defaultdict(Decimal)
+        for credit in serializer.validated_data:
+            amounts_by_email[credit["email"]] += credit["amount"]
+        credited = bulk_credit(amounts_by_email)
+        return Response({"credited": credited}, status=status.HTTP_200_OK)
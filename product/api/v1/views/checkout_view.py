@@ -0,0 +1,38 @@
+from rest_framework import permissions, status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from api.v1.idempotency import idempotent
+from api.v1.permissions import purchase_courses
+from api.v1.serializers.user_serializer import (
+    CheckoutSerializer,
+    SubscriptionSerializer,
+)
+
+
+class CheckoutViewSet(viewsets.GenericViewSet):
+    """Покупка нескольких курсов одним платежом."""
+
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = CheckoutSerializer
+
+    @idempotent
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            subscriptions = purchase_courses(
+                request.user, serializer.validated_data["course_ids"]
+            )
+        except ValidationError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        data = {
+            "subscriptions": SubscriptionSerializer(
+                subscriptions, many=True
+            ).data,
+            "message": "Payment successful. Access granted to the courses.",
+        }
+        return Response(data, status=status.HTTP_201_CREATED)
@@ -1,11 +1,22 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Max, Prefetch, Value
 from django.shortcuts import get_object_or_404
 from rest_framework import status, viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.exceptions import ValidationError
 
-from api.v1.permissions import IsStudentOrIsAdmin, make_payment
+from api.v1.idempotency import idempotent
+from api.v1.mixins import (
+    ConditionalListMixin,
+    SparseFieldsMixin,
+    collection_state,
+)
+from api.v1.permissions import IsStudentOrIsAdmin, purchase_course
 from api.v1.serializers.course_serializer import (
+    AvailableCourseSerializer,
     CourseSerializer,
     CreateCourseSerializer,
     CreateGroupSerializer,
@@ -13,11 +24,20 @@ from api.v1.serializers.course_serializer import (
     GroupSerializer,
     LessonSerializer,
 )
-from api.v1.serializers.user_serializer import SubscriptionSerializer
-from courses.models import Course
+from api.v1.serializers.user_serializer import (
+    PurchaseSerializer,
+    SubscriptionSerializer,
+)
+from courses.models import Course, Group, Lesson
+from users.purchases import reserve_purchase
+from courses.statistics import statistics_cache_info
+
+User = get_user_model()
 
 
-class LessonViewSet(viewsets.ModelViewSet):
+class LessonViewSet(
+    ConditionalListMixin, SparseFieldsMixin, viewsets.ModelViewSet
+):
     """Уроки."""
 
     permission_classes = (IsStudentOrIsAdmin,)
@@ -39,10 +59,21 @@ class LessonViewSet(viewsets.ModelViewSet):
             Course,
             id=self.kwargs.get("course_id")
         )
-        return course.lessons.all()
+        return course.lessons.select_related("course")
+
+    def get_list_state(self):
+        course_id = self.kwargs.get("course_id")
+        return collection_state(
+            ("course", Course.objects.filter(pk=course_id), "updated_at"),
+            (
+                "lessons",
+                Lesson.objects.filter(course_id=course_id),
+                "updated_at",
+            ),
+        )
 
 
-class GroupViewSet(viewsets.ModelViewSet):
+class GroupViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     """Группы."""
 
     permission_classes = (permissions.IsAdminUser,)
@@ -64,29 +95,94 @@ class GroupViewSet(viewsets.ModelViewSet):
             Course,
             id=self.kwargs.get("course_id")
         )
-        return course.groups.all()
+        groups = course.groups.all()
+        if self.is_field_requested("students"):
+            groups = groups.prefetch_related(
+                Prefetch("students", queryset=User.objects.only("id"))
+            )
+        return groups
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(
+    ConditionalListMixin, SparseFieldsMixin, viewsets.ModelViewSet
+):
     """Курсы"""
 
     queryset = Course.objects.all()
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+    sparse_field_columns = {"demand_course_percent": ("students_count",)}
 
     def get_serializer_class(self):
         if self.action in ["list", "retrieve"]:
             return CourseSerializer
+        if self.action == "available":
+            return AvailableCourseSerializer
         return CreateCourseSerializer
 
+    def get_queryset(self):
+        if self.action in ["list", "retrieve"]:
+            courses = Course.objects.with_lesson_titles()
+            if not self.is_field_requested("lessons"):
+                courses = courses.prefetch_related(None)
+            return courses
+        if self.action == "available":
+            return Course.objects.available_for(self.request.user)
+        return super().get_queryset()
+
+    def get_list_state(self):
+        # Покупки, уроки и удаление групп меняют счетчики и updated_at
+        # курса, поэтому уроки и группы проверяются только по индексу
+        # updated_at, а подписки не пересчитываются. Пользователи входят
+        # в demand_course_percent: новых выдает максимальный id,
+        # удаленных - количество.
+        return collection_state(
+            ("courses", Course.objects.all(), "updated_at"),
+            ("lessons", Lesson.objects.all(), "updated_at", Value(0)),
+            ("groups", Group.objects.all(), "updated_at", Value(0)),
+            ("users", User.objects.all(), None, Max("pk")),
+            ("users_count", User.objects.all(), None),
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in [
+            "list", "retrieve"
+        ] and self.is_field_requested("demand_course_percent"):
+            # Общее количество пользователей считается один раз на запрос.
+            context["users_count"] = User.objects.count()
+        return context
+
+    @action(
+        methods=["get"], detail=False, permission_classes=(permissions.IsAuthenticated,)
+    )
+    def available(self, request):
+        """Список курсов, доступных для покупки."""
+
+        return self.list(request)
+
+    @action(
+        methods=["get"],
+        detail=False,
+        url_path="statistics-cache",
+        permission_classes=(permissions.IsAdminUser,),
+    )
+    def statistics_cache(self, request):
+        """Попадания и промахи кеша статистики курсов."""
+
+        return Response(statistics_cache_info())
+
     @action(
         methods=["post"], detail=True, permission_classes=(permissions.IsAuthenticated,)
     )
+    @idempotent
     def pay(self, request, pk=None):
         """Покупка доступа к курсу (подписка на курс)."""
 
         course = self.get_object()
         try:
-            subscription = make_payment(request, course.id)
+            if settings.PURCHASE_QUEUE_ENABLED:
+                return self.enqueue_purchase(request, course)
+            subscription = purchase_course(request.user, course)
             serializer = SubscriptionSerializer(subscription)
             data = {
                 "subscription": serializer.data,
@@ -98,3 +194,18 @@ class CourseViewSet(viewsets.ModelViewSet):
                 {"error": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+    def enqueue_purchase(self, request, course):
+        """Покупка через очередь: ответ 202 и адрес статуса покупки."""
+
+        purchase = reserve_purchase(request.user, course)
+        data = {
+            "purchase": PurchaseSerializer(purchase).data,
+            "message": "Payment accepted. Access will be granted shortly.",
+        }
+        location = reverse(
+            "purchases-detail", args=[purchase.pk], request=request
+        )
+        return Response(
+            data, status=status.HTTP_202_ACCEPTED, headers={"Location": location}
+        )
@@ -0,0 +1,142 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from courses.models import Group
+from courses.services import student_field
+from product.db import batches
+from users.models import Balance, Subscription
+
+CHUNK_SIZE = 2000
+# Строк в одном фрагменте ответа: меньше накладных расходов на yield.
+LINES_PER_CHUNK = 500
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+class Echo:
+    """Буфер для csv.writer, который сразу возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(rows, fields):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def csv_lines(rows, fields):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row[field] for field in fields)
+
+
+def chunks(lines):
+    for batch in batches(lines, LINES_PER_CHUNK):
+        yield "".join(batch)
+
+
+class ExportViewSet(viewsets.GenericViewSet):
+    """Потоковая выгрузка данных для сотрудников в NDJSON или CSV.
+
+    Строки читаются через iterator() и сразу отдаются клиенту, поэтому
+    расход памяти не зависит от размера таблицы. Формат выбирается
+    параметром ``?type=ndjson|csv`` (по умолчанию ndjson).
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+    pagination_class = None
+
+    def export(self, name, queryset, fields):
+        kind = self.request.query_params.get("type", "ndjson")
+        if kind not in CONTENT_TYPES:
+            return Response(
+                {"error": f"Unknown export type: {kind}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        rows = queryset.values(*fields).iterator(chunk_size=CHUNK_SIZE)
+        lines = (ndjson_lines if kind == "ndjson" else csv_lines)(rows, fields)
+        response = StreamingHttpResponse(
+            chunks(lines), content_type=CONTENT_TYPES[kind]
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{name}.{kind}"'
+        )
+        return response
+
+    @action(detail=False)
+    def subscriptions(self, request):
+        """Подписки с пользователем и курсом."""
+
+        queryset = Subscription.objects.annotate(
+            email=F("user__email"),
+            username=F("user__username"),
+            course_title=F("course__title"),
+        ).order_by("id")
+        return self.export(
+            "subscriptions",
+            queryset,
+            (
+                "id",
+                "subscribed_at",
+                "user_id",
+                "email",
+                "username",
+                "course_id",
+                "course_title",
+            ),
+        )
+
+    @action(detail=False)
+    def rosters(self, request):
+        """Составы групп; ``?course=<id>`` ограничивает выгрузку курсом."""
+
+        student = student_field()
+        queryset = Group.students.through.objects.annotate(
+            group_title=F("group__title"),
+            course_id=F("group__course_id"),
+            course_title=F("group__course__title"),
+            user_id=F(f"{student}_id"),
+            email=F(f"{student}__email"),
+            first_name=F(f"{student}__first_name"),
+            last_name=F(f"{student}__last_name"),
+        ).order_by("group_id", "id")
+        course = request.query_params.get("course", "")
+        if course.isdigit():
+            queryset = queryset.filter(group__course_id=course)
+        return self.export(
+            "rosters",
+            queryset,
+            (
+                "course_id",
+                "course_title",
+                "group_id",
+                "group_title",
+                "user_id",
+                "email",
+                "first_name",
+                "last_name",
+            ),
+        )
+
+    @action(detail=False)
+    def balances(self, request):
+        """Балансы пользователей."""
+
+        queryset = Balance.objects.annotate(
+            email=F("user__email")
+        ).order_by("user_id")
+        return self.export(
+            "balances", queryset, ("user_id", "email", "amount")
+        )
@@ -0,0 +1,24 @@
+from django.conf import settings
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api.metrics import route_metrics
+from api.v1.authentication import token_cache
+from courses.statistics import statistics_cache_info
+
+
+class MetricsView(APIView):
+    """Перцентили времени ответа по маршрутам и состояние кешей."""
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return Response(
+            {
+                "enabled": settings.API_METRICS_ENABLED,
+                "routes": route_metrics.summary(),
+                "statistics_cache": statistics_cache_info(),
+                "token_cache": token_cache.info(),
+            }
+        )
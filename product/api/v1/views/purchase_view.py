@@ -0,0 +1,16 @@
+from rest_framework import mixins, permissions, viewsets
+
+from api.v1.serializers.user_serializer import PurchaseSerializer
+from users.models import Purchase
+
+
+class PurchaseViewSet(
+    mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+):
+    """Статус покупок пользователя из очереди."""
+
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = PurchaseSerializer
+
+    def get_queryset(self):
+        return Purchase.objects.filter(user=self.request.user)
@@ -0,0 +1,41 @@
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api.v1.serializers.course_serializer import (
+    CourseSearchSerializer,
+    LessonSearchSerializer,
+)
+from courses.search import search_courses, search_lessons
+from users.entitlements import get_course_ids
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class SearchView(APIView):
+    """
+    Поиск курсов и уроков: ``?q=`` - слова или их начала.
+
+    Уроки со ссылками ищутся только в купленных курсах (staff - во всех).
+    """
+
+    def get(self, request):
+        query = request.query_params.get("q", "")
+        try:
+            limit = int(request.query_params.get("limit", DEFAULT_LIMIT))
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        limit = max(1, min(limit, MAX_LIMIT))
+        course_ids = None
+        if not request.user.is_staff:
+            course_ids = get_course_ids(request.user.pk)
+        return Response(
+            {
+                "courses": CourseSearchSerializer(
+                    search_courses(query, limit), many=True
+                ).data,
+                "lessons": LessonSearchSerializer(
+                    search_lessons(query, limit, course_ids), many=True
+                ).data,
+            }
+        )
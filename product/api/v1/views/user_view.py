@@ -1,13 +1,63 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
 from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 
-from api.v1.serializers.user_serializer import CustomUserSerializer
+from api.v1.mixins import SparseFieldsMixin
+from api.v1.serializers.user_serializer import (
+    CustomUserSerializer,
+    StudentSubscriptionSerializer,
+)
+from courses.models import Lesson
+from users.dashboard import get_student_courses, store_student_courses
+from users.models import Subscription
 
 User = get_user_model()
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
     http_method_names = ["get", "head", "options"]
     permission_classes = (permissions.IsAdminUser,)
+
+    @action(
+        methods=["get"],
+        detail=False,
+        url_path="me/courses",
+        url_name="me-courses",
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def my_courses(self, request):
+        """Купленные курсы текущего пользователя с группой и уроками."""
+
+        user = request.user
+        data = get_student_courses(user.pk)
+        if data is None:
+            # Три запроса при любом количестве курсов: подписки с курсами,
+            # группы пользователя и уроки.
+            subscriptions = (
+                Subscription.objects.filter(user=user)
+                .select_related("course")
+                .prefetch_related(
+                    Prefetch(
+                        "course__groups",
+                        queryset=user.course_groups.only(
+                            "id", "title", "course_id"
+                        ),
+                        to_attr="student_groups",
+                    ),
+                    Prefetch(
+                        "course__lessons",
+                        queryset=Lesson.objects.only("id", "title", "course_id"),
+                    ),
+                )
+            )
+            data = StudentSubscriptionSerializer(subscriptions, many=True).data
+            store_student_courses(
+                user.pk,
+                data,
+                [subscription.course_id for subscription in subscriptions],
+            )
+        return Response(data)
@@ -0,0 +1,176 @@
+"""
+Нагрузочный тест каталога под WSGI и ASGI с медленными клиентами.
+
+Запуск из каталога ``product``::
+
+    python benchmarks/asgi_load.py --clients 1000 --delay 0.5
+
+Оба сервера работают в процессе теста: WSGI-приложение обслуживает
+пул рабочих потоков, как в многопоточном WSGI-сервере, а ASGI-приложение -
+один цикл событий. Каждый клиент читает ответ ``--delay`` секунд.
+Рабочий поток WSGI все это время занят, а соединение ASGI только
+ждет в ``send``.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+def setup(directory):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "product.settings")
+    os.environ["DB_NAME"] = str(Path(directory) / "load.sqlite3")
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+    import django
+
+    django.setup()
+
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from rest_framework.authtoken.models import Token
+
+    from benchmarks.seed import seed
+
+    call_command("migrate", verbosity=0)
+    seed(users=500, courses=200, lessons_per_course=10, subscriptions_per_user=5)
+    user = get_user_model().objects.order_by("id").first()
+    return Token.objects.create(user=user).key
+
+
+def summary(name, clients, statuses, elapsed):
+    return {
+        "server": name,
+        "clients": clients,
+        "errors": sum(status != 200 for status in statuses),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(clients / elapsed, 1),
+    }
+
+
+def run_wsgi(path, token, clients, delay, threads):
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+
+    def client(_):
+        statuses = []
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path,
+            "QUERY_STRING": "",
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "HTTP_HOST": "localhost",
+            "HTTP_AUTHORIZATION": f"Token {token}",
+            "wsgi.input": io.BytesIO(),
+            "wsgi.url_scheme": "http",
+            "wsgi.errors": sys.stderr,
+        }
+        body = application(
+            environ, lambda status, headers: statuses.append(int(status[:3]))
+        )
+        for _ in body:
+            # Медленный клиент: поток занят, пока ответ не прочитан.
+            time.sleep(delay)
+        body.close()
+        return statuses[0]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(client, range(clients)))
+    return summary(
+        f"wsgi ({threads} threads)",
+        clients,
+        statuses,
+        time.perf_counter() - started,
+    )
+
+
+def run_asgi(path, token, clients, delay):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"authorization", f"Token {token}".encode()),
+        ],
+        "server": ("localhost", 80),
+        "client": ("127.0.0.1", 0),
+    }
+
+    async def client():
+        statuses = []
+        disconnect = asyncio.Event()
+
+        async def receive():
+            if not statuses:
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+            elif not message.get("more_body"):
+                # Медленный клиент: ждет только это соединение.
+                await asyncio.sleep(delay)
+                disconnect.set()
+
+        await application(dict(scope), receive, send)
+        return statuses[0]
+
+    async def main():
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(client() for _ in range(clients)))
+        return statuses, time.perf_counter() - started
+
+    statuses, elapsed = asyncio.run(main())
+    return summary("asgi (async view)", clients, statuses, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--clients", type=int, default=1000, help="Одновременные клиенты."
+    )
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=0.5,
+        help="Время чтения ответа клиентом, секунды.",
+    )
+    parser.add_argument(
+        "--threads", type=int, default=32, help="Рабочие потоки WSGI."
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        token = setup(directory)
+        results = [
+            run_wsgi(
+                "/api/v1/courses/", token, args.clients, args.delay, args.threads
+            ),
+            run_asgi("/api/v1/async/courses/", token, args.clients, args.delay),
+        ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Сценарии бенчмарка основных путей API через тестовый клиент.
+
+У каждого сценария есть бюджет SQL-запросов: если запрос к API делает
+больше запросов к БД, прогон считается регрессией.
+"""
+
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from courses.models import Course
+from users.models import Balance, Subscription
+
+User = get_user_model()
+
+
+class Scenario:
+    """Один путь API: как построить запрос, ожидаемый статус, бюджет."""
+
+    def __init__(
+        self, name, method, url, budget, status=200, admin=False, cold_cache=False
+    ):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.budget = budget
+        self.status = status
+        self.admin = admin
+        self.cold_cache = cold_cache
+
+
+def catalog_url(context):
+    return reverse("courses-list")
+
+
+def available_url(context):
+    return reverse("courses-available")
+
+
+def lessons_url(context):
+    return reverse("lessons-list", args=(context["course_id"],))
+
+
+def groups_url(context):
+    return reverse("groups-list", args=(context["course_id"],))
+
+
+def users_url(context):
+    return reverse("users-list")
+
+
+def pay_url(context):
+    return reverse("courses-pay", args=(next(context["unpaid"]),))
+
+
+SCENARIOS = (
+    Scenario("catalog", "get", catalog_url, budget=5, cold_cache=True),
+    Scenario("catalog_cached", "get", catalog_url, budget=4),
+    Scenario("available", "get", available_url, budget=1),
+    Scenario("lessons", "get", lessons_url, budget=3),
+    Scenario("groups", "get", groups_url, budget=3, admin=True),
+    Scenario("users", "get", users_url, budget=1, admin=True),
+    Scenario("pay", "post", pay_url, budget=14, status=201),
+)
+
+
+def prepare(repeat):
+    """Студент и администратор бенчмарка, курс с данными, курсы для покупки."""
+    student = User.objects.filter(subscriptions__isnull=False).order_by("id").first()
+    admin, _ = User.objects.get_or_create(
+        username="bench-admin",
+        defaults={
+            "email": "bench-admin@example.com",
+            "is_staff": True,
+            "is_superuser": True,
+        },
+    )
+    buyer, created = User.objects.get_or_create(
+        username="bench-buyer", defaults={"email": "bench-buyer@example.com"}
+    )
+    Balance.objects.update_or_create(user=buyer, defaults={"amount": 10**7})
+    purchased = Subscription.objects.filter(user=buyer).values("course_id")
+    unpaid = list(
+        Course.objects.exclude(id__in=purchased)
+        .order_by("id")
+        .values_list("id", flat=True)[:repeat]
+    )
+    if len(unpaid) < repeat:
+        raise ValueError("Not enough unpurchased courses for the pay scenario.")
+    return {
+        "student": student,
+        "admin": admin,
+        "buyer": buyer,
+        "course_id": student.subscriptions.values_list("course_id", flat=True)[0],
+        "unpaid": iter(unpaid),
+    }
+
+
+def run_scenario(scenario, context, repeat):
+    client = APIClient()
+    if scenario.name == "pay":
+        client.force_authenticate(user=context["buyer"])
+    else:
+        client.force_authenticate(
+            user=context["admin"] if scenario.admin else context["student"]
+        )
+    # Прогрев: первый запрос заполняет кеши и не попадает в замеры.
+    if scenario.name != "pay":
+        getattr(client, scenario.method)(scenario.url(context))
+
+    timings, queries = [], []
+    for _ in range(repeat):
+        url = scenario.url(context)
+        if scenario.cold_cache:
+            for cache in caches.all():
+                cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = getattr(client, scenario.method)(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != scenario.status:
+            raise AssertionError(
+                f"{scenario.name}: {response.status_code} "
+                f"instead of {scenario.status}"
+            )
+        queries.append(len(captured))
+
+    timings.sort()
+    return {
+        "name": scenario.name,
+        "requests": repeat,
+        "queries": max(queries),
+        "budget": scenario.budget,
+        "within_budget": max(queries) <= scenario.budget,
+        "min_ms": round(timings[0], 2),
+        "median_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 2),
+        "max_ms": round(timings[-1], 2),
+    }
+
+
+def run(repeat=20, names=None):
+    """Прогон сценариев; names ограничивает набор по имени."""
+    scenarios = [
+        scenario for scenario in SCENARIOS if not names or scenario.name in names
+    ]
+    context = prepare(repeat)
+    return [run_scenario(scenario, context, repeat) for scenario in scenarios]
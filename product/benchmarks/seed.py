@@ -0,0 +1,154 @@
+"""
+Заполнение БД данными заданного объема для бенчмарков.
+
+Все строки создаются через bulk_create пачками, сигналы не срабатывают,
+поэтому балансы, журнал, группы и счетчики заполняются здесь же.
+Данные детерминированы: одинаковые параметры дают одинаковую БД.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from courses.models import COURSE_GROUPS_COUNT, Course, Group, Lesson
+from courses.services import student_field
+from product.db import batches
+from users.models import Subscription
+from users.services import provision_users
+
+User = get_user_model()
+
+DEFAULTS = {
+    "users": 100_000,
+    "courses": 5_000,
+    "lessons_per_course": 100,
+    "subscriptions_per_user": 10,
+}
+
+
+def subscribed_courses(user_index, courses, per_user):
+    """Номера курсов, на которые подписан пользователь с номером user_index."""
+    stride = max(1, courses // per_user)
+    return {(user_index + step * stride) % courses for step in range(per_user)}
+
+
+def seed(
+    users=DEFAULTS["users"],
+    courses=DEFAULTS["courses"],
+    lessons_per_course=DEFAULTS["lessons_per_course"],
+    subscriptions_per_user=DEFAULTS["subscriptions_per_user"],
+    batch_size=5000,
+    log=None,
+):
+    """Создает пользователей, курсы, уроки, группы и подписки.
+
+    Подписчики курса распределяются по группам по кругу, поэтому
+    student_count групп вычисляется заранее, без пересчета.
+    """
+    log = log or (lambda message: None)
+    subscriptions_per_user = min(subscriptions_per_user, courses)
+
+    user_ids = []
+    for numbers in batches(range(users), batch_size):
+        user_ids += [
+            user.pk
+            for user in provision_users(
+                User(
+                    username=f"bench{number}",
+                    email=f"bench{number}@example.com",
+                    first_name="Bench",
+                    last_name=str(number),
+                )
+                for number in numbers
+            )
+        ]
+    log(f"users: {len(user_ids)}")
+
+    course_ids = [
+        course.pk
+        for course in Course.objects.bulk_create(
+            (
+                Course(
+                    author=f"Author {number % 100}",
+                    title=f"Course {number}",
+                    start_date="2024-01-01T00:00:00Z",
+                    price=1,
+                    available=True,
+                )
+                for number in range(courses)
+            ),
+            batch_size=batch_size,
+        )
+    ]
+    log(f"courses: {len(course_ids)}")
+
+    lessons = courses * lessons_per_course
+    for numbers in batches(range(lessons), batch_size):
+        Lesson.objects.bulk_create(
+            Lesson(
+                title=f"Lesson {number % lessons_per_course}",
+                link="https://example.com/",
+                course_id=course_ids[number // lessons_per_course],
+            )
+            for number in numbers
+        )
+    log(f"lessons: {lessons}")
+
+    subscribers = [0] * courses
+    for user_index in range(users):
+        for course_index in subscribed_courses(
+            user_index, courses, subscriptions_per_user
+        ):
+            subscribers[course_index] += 1
+
+    groups = Group.objects.bulk_create(
+        (
+            Group(
+                title=f"Группа №{number + 1}",
+                course_id=course_id,
+                student_count=(
+                    subscribers[course_index] // COURSE_GROUPS_COUNT
+                    + (number < subscribers[course_index] % COURSE_GROUPS_COUNT)
+                ),
+            )
+            for course_index, course_id in enumerate(course_ids)
+            for number in range(COURSE_GROUPS_COUNT)
+        ),
+        batch_size=batch_size,
+    )
+    group_ids = [group.pk for group in groups]
+    log(f"groups: {len(group_ids)}")
+
+    Membership = Group.students.through
+    assigned = [0] * courses
+    student_id = f"{student_field()}_id"
+    per_batch = max(1, batch_size // subscriptions_per_user)
+    for numbers in batches(range(users), per_batch):
+        subscriptions, members = [], []
+        for user_index in numbers:
+            user_id = user_ids[user_index]
+            for course_index in subscribed_courses(
+                user_index, courses, subscriptions_per_user
+            ):
+                subscriptions.append(
+                    Subscription(user_id=user_id, course_id=course_ids[course_index])
+                )
+                group = assigned[course_index] % COURSE_GROUPS_COUNT
+                assigned[course_index] += 1
+                members.append(
+                    Membership(
+                        group_id=group_ids[course_index * COURSE_GROUPS_COUNT + group],
+                        **{student_id: user_id},
+                    )
+                )
+        with transaction.atomic():
+            Subscription.objects.bulk_create(subscriptions)
+            Membership.objects.bulk_create(members)
+    log(f"subscriptions: {sum(subscribers)}")
+
+    return {
+        "users": users,
+        "courses": courses,
+        "lessons": lessons,
+        "groups": len(group_ids),
+        "subscriptions": sum(subscribers),
+    }
@@ -0,0 +1,193 @@
+"""
+Параллельные покупки рядом с медленными потоковыми чтениями
+с профилем production SQLite и без него.
+
+Запуск из каталога ``product``::
+
+    python benchmarks/sqlite_profile.py --writers 4 --readers 2
+
+Каждый профиль работает со своей новой БД; писатели и читатели -
+отдельные процессы. Читатели выгружают таблицу курсов так же, как
+выгрузки staff для медленного клиента, и держат запрос открытым.
+В режиме rollback journal открытое чтение блокирует каждый коммит
+до своего завершения, поэтому покупки ждут (и падают после
+busy_timeout); в режиме WAL читатели и писатель не мешают друг другу.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROFILES = ("development", "production")
+
+
+def writer(user_id, course_ids, results):
+    from django.contrib.auth import get_user_model
+
+    from api.v1.permissions import purchase_course
+    from courses.models import Course
+
+    user = get_user_model().objects.get(pk=user_id)
+    timings, errors = [], 0
+    for course in Course.objects.filter(pk__in=course_ids):
+        started = time.perf_counter()
+        try:
+            purchase_course(user, course)
+        except Exception:
+            errors += 1
+        timings.append((time.perf_counter() - started) * 1000)
+    results.put((timings, errors))
+
+
+def reader(stop, row_delay):
+    from courses.models import Course
+
+    while not stop.is_set():
+        for _ in Course.objects.values("id", "title").iterator(chunk_size=10):
+            time.sleep(row_delay)
+
+
+def percentile(timings, share):
+    return round(timings[int(share * (len(timings) - 1))], 1)
+
+
+def run_profile(writers, readers, purchases, row_delay):
+    import django
+
+    django.setup()
+
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.db import connections
+
+    from courses.models import Course
+    from users.services import provision_users
+
+    User = get_user_model()
+
+    call_command("migrate", verbosity=0)
+    users = provision_users(
+        User(username=f"user{number}", email=f"user{number}@example.com")
+        for number in range(writers)
+    )
+    course_ids = [
+        course.pk
+        for course in Course.objects.bulk_create(
+            Course(
+                author="Benchmark",
+                title=f"Course {number}",
+                start_date="2024-01-01T00:00:00Z",
+                price=1,
+            )
+            for number in range(purchases)
+        )
+    ]
+    connections.close_all()
+
+    context = multiprocessing.get_context("fork")
+    results, stop = context.Queue(), context.Event()
+    reading = [
+        context.Process(target=reader, args=(stop, row_delay))
+        for _ in range(readers)
+    ]
+    writing = [
+        context.Process(target=writer, args=(user.pk, course_ids, results))
+        for user in users
+    ]
+    for process in reading:
+        process.start()
+    started = time.perf_counter()
+    for process in writing:
+        process.start()
+    timings, errors = [], 0
+    for _ in writing:
+        process_timings, process_errors = results.get()
+        timings.extend(process_timings)
+        errors += process_errors
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for process in writing + reading:
+        process.join()
+
+    timings.sort()
+    completed = len(timings) - errors
+    return {
+        "profile": os.environ["DATABASE_PROFILE"],
+        "purchases": completed,
+        "errors": errors,
+        "purchases_per_second": round(completed / elapsed, 1),
+        "p50_ms": percentile(timings, 0.5),
+        "p99_ms": percentile(timings, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--writers", type=int, default=4, help="Процессы покупателей."
+    )
+    parser.add_argument(
+        "--readers", type=int, default=2, help="Процессы медленных читателей."
+    )
+    parser.add_argument(
+        "--purchases",
+        type=int,
+        default=50,
+        help="Покупок на каждого покупателя (по курсу на покупку).",
+    )
+    parser.add_argument(
+        "--row-delay",
+        type=float,
+        default=0.005,
+        help="Пауза читателя на строку, секунды (медленный клиент).",
+    )
+    parser.add_argument("--profile", choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        print(
+            json.dumps(
+                run_profile(
+                    args.writers, args.readers, args.purchases, args.row_delay
+                )
+            )
+        )
+        return
+
+    results = []
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(
+                os.environ,
+                DJANGO_SETTINGS_MODULE="product.settings",
+                DATABASE_PROFILE=profile,
+                DB_NAME=str(Path(directory) / "benchmark.sqlite3"),
+                PYTHONPATH=str(Path(__file__).resolve().parent.parent),
+            )
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "--profile", profile,
+                    "--writers", str(args.writers),
+                    "--readers", str(args.readers),
+                    "--purchases", str(args.purchases),
+                    "--row-delay", str(args.row_delay),
+                ],
+                env=env,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results.append(json.loads(output.splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,40 @@
 from django.contrib import admin
 from .models import Course, Lesson, Group
+from .search import filter_by_search
+from .services import rebalance_groups
+
+
+class FullTextSearchMixin:
+    """Поиск в админке через полнотекстовый индекс курсов и уроков."""
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return filter_by_search(queryset, search_term, self.search_fields), False
 
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
-    list_display = ("title", "author", "start_date", "price")
+class CourseAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    list_display = (
+        "title",
+        "author",
+        "start_date",
+        "price",
+        "lessons_count",
+        "students_count",
+    )
     search_fields = ("title", "author")
     list_filter = ("start_date",)
+    actions = ("rebalance_course_groups",)
+
+    @admin.action(description="Распределить студентов по группам")
+    def rebalance_course_groups(self, request, queryset):
+        moved = rebalance_groups(*queryset.values_list("pk", flat=True))
+        self.message_user(request, f"Students placed into groups: {moved}")
 
 
 @admin.register(Lesson)
-class LessonAdmin(admin.ModelAdmin):
+class LessonAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("title", "course", "link")
     search_fields = ("title", "course__title")
     list_filter = ("course",)
@@ -18,6 +42,6 @@ class LessonAdmin(admin.ModelAdmin):
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
-    list_display = ("title", "course")
+    list_display = ("title", "course", "student_count")
     search_fields = ("title", "course__title")
     list_filter = ("course",)
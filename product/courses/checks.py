@@ -0,0 +1,29 @@
+from django.core.checks import Tags, Warning, register
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+
+from courses.search import missing_search_objects
+
+
+@register(Tags.database)
+def search_index_check(app_configs, databases=None, **kwargs):
+    """Триггеры полнотекстового индекса на месте после миграций."""
+    warnings = []
+    for alias in databases or ():
+        connection = connections[alias]
+        if connection.vendor != "sqlite":
+            continue
+        applied = MigrationRecorder(connection).applied_migrations()
+        if ("courses", "0007_search_index") not in applied:
+            continue
+        missing = missing_search_objects(connection)
+        if missing:
+            warnings.append(
+                Warning(
+                    f"Search index on '{alias}' is out of sync: "
+                    f"missing {', '.join(missing)}.",
+                    hint="Run manage.py rebuild_search_index.",
+                    id="courses.W001",
+                )
+            )
+    return warnings
@@ -0,0 +1,87 @@
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Now
+
+
+def adjust_course_counters(field, deltas):
+    """Изменение счетчика курсов на величины из {course_id: delta}.
+
+    Курсы с одинаковым изменением обновляются одним UPDATE.
+    """
+    Course = apps.get_model("courses", "Course")
+    by_delta = defaultdict(list)
+    for course_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(course_id)
+    for delta, course_ids in by_delta.items():
+        Course.objects.filter(pk__in=course_ids).update(
+            updated_at=Now(), **{field: F(field) + delta}
+        )
+
+
+def count_created(field, objs, conflicts=False):
+    """Счетчики курсов после пакетной вставки строк objs."""
+    course_ids = Counter(obj.course_id for obj in objs)
+    if conflicts:
+        # Неизвестно, какие строки вставлены: счетчики пересчитываются.
+        from courses.services import recount_courses
+
+        recount_courses(list(course_ids))
+    else:
+        adjust_course_counters(field, course_ids)
+
+
+def count_deleted(field, counts):
+    """Счетчики курсов после удаления строк, {course_id: количество}."""
+    adjust_course_counters(
+        field, {course_id: -total for course_id, total in counts.items()}
+    )
+
+
+def is_batch_delete(sender, origin):
+    """Удаление идет через QuerySet.delete() самой модели.
+
+    Такое удаление меняет счетчики сразу для всех строк, обработчики
+    post_delete отдельных строк их не трогают.
+    """
+    return isinstance(origin, models.QuerySet) and origin.model is sender
+
+
+class CourseCounterQuerySet(models.QuerySet):
+    """Запросы строк, количество которых хранится в счетчике курса.
+
+    bulk_create и delete() меняют счетчик ``counter_field`` курса
+    сгруппированным UPDATE, без обработки каждой строки.
+    """
+
+    counter_field = None
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        count_created(
+            self.counter_field,
+            objs,
+            kwargs.get("ignore_conflicts") or kwargs.get("update_conflicts"),
+        )
+        return objs
+
+    def delete(self):
+        counts = dict(
+            self.order_by()
+            .values_list("course_id")
+            .annotate(total=models.Count("pk"))
+        )
+        with transaction.atomic(using=self.db):
+            result = super().delete()
+            count_deleted(self.counter_field, counts)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class LessonQuerySet(CourseCounterQuerySet):
+    counter_field = "lessons_count"
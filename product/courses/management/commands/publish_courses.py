@@ -0,0 +1,62 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from courses.services import (
+    prepare_launches,
+    publish_due_courses,
+    upcoming_courses,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Публикует еще не опубликованные курсы в момент начала и заранее "
+        "готовит группы и кеш статистики курсов, которые скоро стартуют."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=60,
+            help="Пауза между проверками, секунды.",
+        )
+        parser.add_argument(
+            "--lead",
+            type=int,
+            default=60,
+            help="За сколько минут до старта готовить курс.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выполнить одну проверку и завершиться.",
+        )
+
+    def handle(self, *args, **options):
+        lead = timedelta(minutes=options["lead"])
+        prepared = set()
+        try:
+            while True:
+                now = timezone.now()
+                published = publish_due_courses(now)
+                upcoming = [
+                    pk for pk in upcoming_courses(now, lead)
+                    if pk not in prepared
+                ]
+                prepare_launches(published + upcoming)
+                prepared.update(upcoming)
+                prepared.difference_update(published)
+                if published or upcoming:
+                    self.stdout.write(
+                        f"Courses published: {len(published)}, "
+                        f"prepared: {len(upcoming)}"
+                    )
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from courses.services import rebalance_groups
+
+
+class Command(BaseCommand):
+    help = "Создает недостающие группы и равномерно распределяет студентов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=int,
+            action="append",
+            dest="courses",
+            help="Идентификатор курса; по умолчанию все курсы с подписками.",
+        )
+
+    def handle(self, *args, **options):
+        moved = rebalance_groups(*options["courses"] or ())
+        self.stdout.write(
+            self.style.SUCCESS(f"Students placed into groups: {moved}")
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from courses.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересоздает триггеры и перестраивает полнотекстовый индекс курсов "
+        "и уроков (после миграций, пересоздающих таблицы на SQLite)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        if connections[options["database"]].vendor != "sqlite":
+            raise CommandError("The search index exists only on SQLite.")
+        rebuild_search_index(options["database"])
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from courses.services import recount_courses
+
+
+class Command(BaseCommand):
+    help = "Исправляет счетчики уроков и студентов курсов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=int,
+            action="append",
+            dest="courses",
+            help="Идентификатор курса; по умолчанию все курсы.",
+        )
+
+    def handle(self, *args, **options):
+        fixed = recount_courses(options["courses"])
+        self.stdout.write(self.style.SUCCESS(f"Courses recounted: {fixed}"))
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(
+                condition=models.Q(("available", True)),
+                fields=["-id"],
+                name="course_available_idx",
+            ),
+        ),
+    ]
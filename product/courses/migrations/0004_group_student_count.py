@@ -0,0 +1,45 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_student_count(apps, schema_editor):
+    Group = apps.get_model("courses", "Group")
+    Group.objects.update(
+        student_count=Coalesce(
+            Subquery(
+                Group.students.through.objects.filter(group=OuterRef("pk"))
+                .order_by()
+                .values("group")
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0003_available_catalog_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="group",
+            name="student_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество студентов"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="group",
+            index=models.Index(
+                fields=["course", "student_count", "id"], name="group_fill_idx"
+            ),
+        ),
+        migrations.RunPython(fill_student_count, migrations.RunPython.noop),
+    ]
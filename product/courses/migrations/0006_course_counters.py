@@ -0,0 +1,55 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:38
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_rows(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(course=OuterRef("pk"))
+            .order_by()
+            .values("course")
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Course = apps.get_model("courses", "Course")
+    Lesson = apps.get_model("courses", "Lesson")
+    Subscription = apps.get_model("users", "Subscription")
+    db_alias = schema_editor.connection.alias
+    Course.objects.using(db_alias).update(
+        lessons_count=count_rows(Lesson),
+        students_count=count_rows(Subscription),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0005_updated_at"),
+        ("users", "0004_balance_ledger"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="lessons_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество уроков"
+            ),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="students_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество студентов"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
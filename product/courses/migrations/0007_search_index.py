@@ -0,0 +1,59 @@
+from django.db import migrations
+
+# Полнотекстовый индекс SQLite FTS5 по внешнему содержимому: таблицы
+# хранят только индекс, а триггеры поддерживают его при любых изменениях,
+# включая bulk_create, QuerySet.update() и удаление каскадом.
+INDEXES = {
+    "courses_course": ("courses_course_fts", ("title", "author")),
+    "courses_lesson": ("courses_lesson_fts", ("title",)),
+}
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for table, (index, columns) in INDEXES.items():
+        names = ", ".join(columns)
+        new = ", ".join(f"new.{column}" for column in columns)
+        old = ", ".join(f"old.{column}" for column in columns)
+        delete = (
+            f"INSERT INTO {index}({index}, rowid, {names}) "
+            f"VALUES ('delete', old.id, {old});"
+        )
+        insert = f"INSERT INTO {index}(rowid, {names}) VALUES (new.id, {new});"
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {index} USING fts5({names}, "
+            f"content='{table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {index}_ai AFTER INSERT ON {table} " f"BEGIN {insert} END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {index}_ad AFTER DELETE ON {table} " f"BEGIN {delete} END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {index}_au AFTER UPDATE OF {names} ON {table} "
+            f"BEGIN {delete} {insert} END"
+        )
+        schema_editor.execute(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for index, _ in INDEXES.values():
+        for suffix in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {index}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {index}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0006_course_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
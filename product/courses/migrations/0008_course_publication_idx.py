@@ -0,0 +1,21 @@
+# Generated by Django 4.2.10 on 2026-10-18 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0007_search_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(
+                condition=models.Q(("available", False)),
+                fields=["start_date"],
+                name="course_publication_idx",
+            ),
+        ),
+    ]
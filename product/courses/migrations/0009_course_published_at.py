@@ -0,0 +1,44 @@
+# Generated by Django 4.2.10 on 2026-10-18 12:41
+
+from django.db import migrations, models
+from django.db.models import F, Q
+from django.db.models.functions import Now
+
+
+def fill_published_at(apps, schema_editor):
+    # Открытые и уже стартовавшие курсы считаются опубликованными:
+    # закрытые среди них сняты с публикации и остаются закрытыми.
+    Course = apps.get_model("courses", "Course")
+    Course.objects.filter(Q(available=True) | Q(start_date__lte=Now())).update(
+        published_at=F("start_date")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0008_course_publication_idx"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="course",
+            name="course_publication_idx",
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="published_at",
+            field=models.DateTimeField(
+                blank=True, editable=False, null=True, verbose_name="Дата публикации"
+            ),
+        ),
+        migrations.RunPython(fill_published_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(
+                condition=models.Q(("available", False), ("published_at", None)),
+                fields=["start_date"],
+                name="course_publication_idx",
+            ),
+        ),
+    ]
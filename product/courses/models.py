@@ -1,5 +1,92 @@
 from django.db import models
 from django.conf import settings
+from django.db.models import (
+    Count,
+    Exists,
+    IntegerField,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Sum,
+)
+from django.db.models.functions import Coalesce
+
+from courses.counters import LessonQuerySet
+from users.models import Subscription
+
+GROUP_MAX_STUDENTS = 30
+COURSE_GROUPS_COUNT = 10
+# Количество уроков и студентов хранится в самом курсе, в кеше
+# статистики - только данные групп.
+STATISTICS_FIELDS = (
+    "groups_count",
+    "groups_students_count",
+)
+
+
+def _aggregate_subquery(queryset, field, aggregate=None):
+    """Коррелированный подзапрос с агрегатом строк по полю ``field``.
+
+    По умолчанию считает количество строк.
+    """
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values(field)
+            .annotate(total=aggregate or Count("pk"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class CourseQuerySet(models.QuerySet):
+    """Запросы курсов."""
+
+    def available_for(self, user):
+        """Доступные курсы, которые пользователь еще не купил."""
+        return self.filter(
+            ~Exists(
+                Subscription.objects.filter(
+                    user=user, course=OuterRef("pk")
+                )
+            ),
+            available=True,
+        )
+
+    def with_statistics(self):
+        """Курсы со статистикой групп, посчитанной в одном запросе."""
+        return self.annotate(
+            groups_count=_aggregate_subquery(
+                Group.objects.filter(course=OuterRef("pk")), "course"
+            ),
+            groups_students_count=_aggregate_subquery(
+                Group.objects.filter(course=OuterRef("pk")),
+                "course",
+                Sum("student_count"),
+            ),
+        )
+
+    def with_actual_counters(self):
+        """Курсы с фактическим количеством уроков и студентов."""
+        return self.alias(
+            actual_lessons_count=_aggregate_subquery(
+                Lesson.objects.filter(course=OuterRef("pk")), "course"
+            ),
+            actual_students_count=_aggregate_subquery(
+                Subscription.objects.filter(course=OuterRef("pk")), "course"
+            ),
+        )
+
+    def with_lesson_titles(self):
+        """Курсы с предзагруженными названиями уроков."""
+        return self.prefetch_related(
+            Prefetch(
+                "lessons",
+                queryset=Lesson.objects.only("id", "title", "course_id"),
+            )
+        )
 
 
 class Course(models.Model):
@@ -29,10 +116,53 @@ class Course(models.Model):
         verbose_name="Доступен"
     )
 
+    lessons_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество уроков"
+    )
+
+    students_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество студентов"
+    )
+
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения"
+    )
+
+    # Первое открытие курса: снятый с публикации курс (available=False
+    # с заполненной датой) планировщик повторно не открывает.
+    published_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Дата публикации"
+    )
+
+    objects = CourseQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Курс"
         verbose_name_plural = "Курсы"
         ordering = ("-id",)
+        indexes = (
+            models.Index(
+                fields=("-id",),
+                condition=models.Q(available=True),
+                name="course_available_idx",
+            ),
+            # Неопубликованные курсы по дате начала для публикации
+            # по расписанию.
+            models.Index(
+                fields=("start_date",),
+                condition=models.Q(available=False, published_at=None),
+                name="course_publication_idx",
+            ),
+        )
 
     def __str__(self):
         return self.title
@@ -56,6 +186,14 @@ class Lesson(models.Model):
         on_delete=models.CASCADE
     )
 
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения"
+    )
+
+    objects = LessonQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Урок"
         verbose_name_plural = "Уроки"
@@ -85,7 +223,25 @@ class Group(models.Model):
         blank=True
     )
 
+    student_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество студентов"
+    )
+
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения"
+    )
+
     class Meta:
         verbose_name = "Группа"
         verbose_name_plural = "Группы"
         ordering = ("-id",)
+        indexes = (
+            models.Index(
+                fields=("course", "student_count", "id"),
+                name="group_fill_idx",
+            ),
+        )
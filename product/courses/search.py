@@ -0,0 +1,217 @@
+"""
+Полнотекстовый поиск по курсам и урокам.
+
+На SQLite используется индекс FTS5 из миграции 0007_search_index:
+таблицы ``courses_course_fts`` (title, author) и ``courses_lesson_fts``
+(title) синхронизируются триггерами на таблицах курсов и уроков.
+SQLite выполняет AlterField пересозданием таблицы, и триггеры при этом
+теряются: после такой миграции нужна команда rebuild_search_index.
+Проверка courses.W001 (manage.py check --database default, migrate)
+сообщает об отсутствующих триггерах.
+На других СУБД поиск выполняется через icontains.
+"""
+
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import connections, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from courses.models import Course, Lesson
+
+TOKEN = re.compile(r"\w+")
+
+# Индексируемые таблицы: индекс FTS5 и его столбцы.
+SEARCH_INDEXES = {
+    "courses_course": ("courses_course_fts", ("title", "author")),
+    "courses_lesson": ("courses_lesson_fts", ("title",)),
+}
+
+# Веса bm25 по столбцам индекса: совпадение в названии курса важнее,
+# чем в имени автора.
+COURSE_WEIGHTS = (10.0, 5.0)
+
+
+def match_expression(query):
+    """Запрос FTS5: все слова обязательны, каждое - как префикс.
+
+    Однобуквенные слова ищутся целиком: для них нет префиксного индекса.
+    """
+    return " ".join(
+        f'"{token}"*' if len(token) > 1 else f'"{token}"'
+        for token in TOKEN.findall(query)
+    )
+
+
+def uses_index(queryset):
+    return connections[queryset.db].vendor == "sqlite"
+
+
+def indexed_rows(model, expression):
+    """Подзапрос идентификаторов строк model, найденных индексом."""
+    index = f"{model._meta.db_table}_fts"
+    return RawSQL(
+        f"SELECT rowid FROM {index} WHERE {index} MATCH %s", (expression,)
+    )
+
+
+def filter_by_search(queryset, query, fields):
+    """Ограничение queryset курсов или уроков поисковым запросом.
+
+    fields используются для поиска через icontains на СУБД без FTS5.
+    Поле связанной модели (``course__title``) ищется по ее индексу.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    if uses_index(queryset):
+        model = queryset.model
+        conditions = []
+        for relation in {f.split("__")[0] for f in fields if "__" in f}:
+            related = model._meta.get_field(relation).related_model
+            rows = indexed_rows(related, expression)
+            conditions.append(Q(**{f"{relation}__in": rows}))
+        if any("__" not in field for field in fields):
+            conditions.append(Q(pk__in=indexed_rows(model, expression)))
+        return queryset.filter(reduce(or_, conditions))
+    return queryset.filter(
+        *(
+            reduce(or_, (Q(**{f"{field}__icontains": token}) for field in fields))
+            for token in TOKEN.findall(query)
+        )
+    )
+
+
+def search_courses(query, limit=20):
+    """Курсы, упорядоченные по релевантности."""
+    expression = match_expression(query)
+    if not expression:
+        return []
+    if not uses_index(Course.objects.all()):
+        return list(
+            filter_by_search(Course.objects.all(), query, ("title", "author"))[
+                :limit
+            ]
+        )
+    return list(
+        Course.objects.raw(
+            "SELECT c.id, c.title, c.author, c.start_date, c.price "
+            "FROM ("
+            "  SELECT rowid, bm25(courses_course_fts, %s, %s) AS score "
+            "  FROM courses_course_fts WHERE courses_course_fts MATCH %s "
+            "  ORDER BY score LIMIT %s"
+            ") found "
+            "JOIN courses_course c ON c.id = found.rowid "
+            "ORDER BY found.score",
+            (*COURSE_WEIGHTS, expression, limit),
+        )
+    )
+
+
+def search_lessons(query, limit=20, course_ids=None):
+    """
+    Уроки, упорядоченные по релевантности, с названием курса.
+
+    ``course_ids`` ограничивает поиск уроками этих курсов
+    (None - уроки всех курсов).
+    """
+    expression = match_expression(query)
+    if not expression or course_ids is not None and not course_ids:
+        return []
+    if not uses_index(Lesson.objects.all()):
+        lessons = Lesson.objects.select_related("course")
+        if course_ids is not None:
+            lessons = lessons.filter(course_id__in=course_ids)
+        lessons = filter_by_search(lessons, query, ("title",))[:limit]
+        for lesson in lessons:
+            lesson.course_title = lesson.course.title
+        return list(lessons)
+    if course_ids is None:
+        return list(
+            Lesson.objects.raw(
+                "SELECT l.id, l.title, l.link, l.course_id, "
+                "c.title AS course_title "
+                "FROM ("
+                "  SELECT rowid, rank FROM courses_lesson_fts "
+                "  WHERE courses_lesson_fts MATCH %s "
+                "  ORDER BY rank LIMIT %s"
+                ") found "
+                "JOIN courses_lesson l ON l.id = found.rowid "
+                "JOIN courses_course c ON c.id = l.course_id "
+                "ORDER BY found.rank",
+                (expression, limit),
+            )
+        )
+    course_ids = sorted(course_ids)
+    placeholders = ", ".join(["%s"] * len(course_ids))
+    return list(
+        Lesson.objects.raw(
+            "SELECT l.id, l.title, l.link, l.course_id, "
+            "c.title AS course_title "
+            "FROM courses_lesson_fts "
+            "JOIN courses_lesson l ON l.id = courses_lesson_fts.rowid "
+            "JOIN courses_course c ON c.id = l.course_id "
+            "WHERE courses_lesson_fts MATCH %s "
+            f"AND l.course_id IN ({placeholders}) "
+            "ORDER BY courses_lesson_fts.rank LIMIT %s",
+            (expression, *course_ids, limit),
+        )
+    )
+
+
+def _trigger_statements(table, index, columns):
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    delete = (
+        f"INSERT INTO {index}({index}, rowid, {names}) "
+        f"VALUES ('delete', old.id, {old});"
+    )
+    insert = f"INSERT INTO {index}(rowid, {names}) VALUES (new.id, {new});"
+    return {
+        f"{index}_ai": (
+            f"CREATE TRIGGER {index}_ai AFTER INSERT ON {table} "
+            f"BEGIN {insert} END"
+        ),
+        f"{index}_ad": (
+            f"CREATE TRIGGER {index}_ad AFTER DELETE ON {table} "
+            f"BEGIN {delete} END"
+        ),
+        f"{index}_au": (
+            f"CREATE TRIGGER {index}_au AFTER UPDATE OF {names} ON {table} "
+            f"BEGIN {delete} {insert} END"
+        ),
+    }
+
+
+def missing_search_objects(connection):
+    """Таблицы индекса и триггеры, которых нет в БД."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+        )
+        existing = {name for (name,) in cursor.fetchall()}
+    expected = []
+    for table, (index, columns) in SEARCH_INDEXES.items():
+        expected.append(index)
+        expected.extend(_trigger_statements(table, index, columns))
+    return [name for name in expected if name not in existing]
+
+
+def rebuild_search_index(using="default"):
+    """Пересоздание триггеров и полная перестройка индекса по таблицам."""
+    connection = connections[using]
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for table, (index, columns) in SEARCH_INDEXES.items():
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+                f"{', '.join(columns)}, content='{table}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2', "
+                f"prefix='2 3 4 5 6')"
+            )
+            for name, sql in _trigger_statements(table, index, columns).items():
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
@@ -0,0 +1,320 @@
+import heapq
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Window
+from django.db.models.functions import Coalesce, Now, RowNumber
+from django.utils import timezone
+
+from courses.models import COURSE_GROUPS_COUNT, Course, Group
+from courses.statistics import (
+    get_course_statistics,
+    invalidate_course_statistics,
+)
+from product.db import batches
+from users.dashboard import invalidate_courses
+from users.models import Subscription
+
+BATCH_SIZE = 900
+
+
+def student_field():
+    """Имя поля пользователя в таблице связей групп и студентов."""
+    return Group.students.field.m2m_reverse_field_name()
+
+
+def refresh_student_counts(group_ids):
+    """Пересчет количества студентов в группах по таблице связей."""
+    Group.objects.filter(pk__in=group_ids).update(
+        updated_at=Now(),
+        student_count=Coalesce(
+            Subquery(
+                Group.students.through.objects.filter(group=OuterRef("pk"))
+                .order_by()
+                .values("group")
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0,
+        )
+    )
+
+
+def recount_courses(course_ids=None):
+    """Исправление счетчиков уроков и студентов курсов.
+
+    Фактические значения считаются коррелированными подзапросами в
+    одном UPDATE, который затрагивает только разошедшиеся курсы.
+    Возвращает количество исправленных курсов.
+    """
+    courses = Course.objects.with_actual_counters().filter(
+        ~Q(lessons_count=F("actual_lessons_count"))
+        | ~Q(students_count=F("actual_students_count"))
+    )
+    if course_ids is not None:
+        courses = courses.filter(pk__in=course_ids)
+    return courses.update(
+        updated_at=Now(),
+        lessons_count=F("actual_lessons_count"),
+        students_count=F("actual_students_count"),
+    )
+
+
+def provision_groups(*course_ids):
+    """Создание групп курсов одним bulk_create для курсов без групп."""
+    with transaction.atomic():
+        # Блокировка курсов, чтобы параллельные покупки не создали
+        # группы дважды.
+        list(
+            Course.objects.select_for_update()
+            .filter(pk__in=course_ids)
+            .values_list("pk")
+        )
+        provisioned = set(
+            Group.objects.filter(course_id__in=course_ids)
+            .values_list("course_id", flat=True)
+            .distinct()
+        )
+        missing = [pk for pk in course_ids if pk not in provisioned]
+        if not missing:
+            return []
+        invalidate_course_statistics(*missing)
+        return Group.objects.bulk_create(
+            Group(title=f"Группа №{number}", course_id=course_id)
+            for course_id in missing
+            for number in range(1, COURSE_GROUPS_COUNT + 1)
+        )
+
+
+def publish_due_courses(now):
+    """Публикация курсов, дата начала которых наступила к now.
+
+    Открываются только курсы, которые еще ни разу не публиковались
+    (published_at пустой): курсы, снятые с публикации, остаются закрытыми
+    при перезапуске планировщика и при нескольких его процессах. Курсы
+    ищутся по частичному индексу и открываются пакетными UPDATE.
+    Возвращает идентификаторы опубликованных курсов.
+    """
+    with transaction.atomic():
+        course_ids = list(
+            Course.objects.select_for_update()
+            .filter(available=False, published_at=None, start_date__lte=now)
+            .order_by()
+            .values_list("pk", flat=True)
+        )
+        for batch in batches(course_ids, BATCH_SIZE):
+            Course.objects.filter(pk__in=batch, published_at=None).update(
+                available=True, published_at=Now(), updated_at=Now()
+            )
+        if course_ids:
+            invalidate_courses(*course_ids)
+    return course_ids
+
+
+def prepare_launches(course_ids):
+    """Группы и кеш статистики курсов до наплыва покупок после старта."""
+    for batch in batches(course_ids, BATCH_SIZE):
+        provision_groups(*batch)
+        # Статистика кешируется после фиксации создания групп.
+        get_course_statistics(batch)
+
+
+def upcoming_courses(now, lead):
+    """Неопубликованные курсы, которые стартуют в ближайшие lead."""
+    return list(
+        Course.objects.filter(
+            available=False,
+            published_at=None,
+            start_date__gt=now,
+            start_date__lte=now + lead,
+        )
+        .order_by()
+        .values_list("pk", flat=True)
+    )
+
+
+def assign_groups(user_id, course_ids):
+    """Зачисление студента в наименее заполненные группы нескольких курсов.
+
+    Количество запросов не зависит от числа курсов: группы читаются
+    и блокируются одним запросом, связи создаются одним bulk_create,
+    счетчики увеличиваются одним UPDATE.
+    """
+    course_ids = list(course_ids)
+    locked = Group.objects.select_for_update().order_by(
+        "course_id", "student_count", "id"
+    ).only("id", "course_id")
+
+    with transaction.atomic():
+        least_filled = {}
+        for group in locked.filter(course_id__in=course_ids):
+            least_filled.setdefault(group.course_id, group)
+        missing = [pk for pk in course_ids if pk not in least_filled]
+        if missing:
+            provision_groups(*missing)
+            for group in locked.filter(course_id__in=missing):
+                least_filled.setdefault(group.course_id, group)
+
+        student_id = f"{student_field()}_id"
+        Group.students.through.objects.bulk_create(
+            Group.students.through(group_id=group.pk, **{student_id: user_id})
+            for group in least_filled.values()
+        )
+        Group.objects.filter(
+            pk__in=[group.pk for group in least_filled.values()]
+        ).update(updated_at=Now(), student_count=F("student_count") + 1)
+        invalidate_course_statistics(*course_ids)
+        return list(least_filled.values())
+
+
+def enroll_students(students_by_course):
+    """Зачисление пачки новых студентов в группы нескольких курсов.
+
+    students_by_course - словарь «курс → идентификаторы студентов».
+    Каждый студент попадает в наименее заполненную группу своего курса;
+    группы читаются одним запросом, связи создаются одним bulk_create,
+    счетчики обновляются одним bulk_update.
+    """
+    course_ids = list(students_by_course)
+    student_id = f"{student_field()}_id"
+    with transaction.atomic():
+        provision_groups(*course_ids)
+        heaps = {}
+        for group in (
+            Group.objects.select_for_update()
+            .filter(course_id__in=course_ids)
+            .only("id", "course_id", "student_count")
+        ):
+            heaps.setdefault(group.course_id, []).append(
+                (group.student_count, group.id, group)
+            )
+
+        added, groups = [], {}
+        for course_id, user_ids in students_by_course.items():
+            heap = heaps[course_id]
+            heapq.heapify(heap)
+            for user_id in user_ids:
+                count, pk, group = heapq.heappop(heap)
+                added.append(
+                    Group.students.through(group_id=pk, **{student_id: user_id})
+                )
+                group.student_count = count + 1
+                groups[pk] = group
+                heapq.heappush(heap, (count + 1, pk, group))
+
+        now = timezone.now()
+        for group in groups.values():
+            group.updated_at = now
+        Group.students.through.objects.bulk_create(added, batch_size=BATCH_SIZE)
+        Group.objects.bulk_update(
+            groups.values(), ["student_count", "updated_at"],
+            batch_size=BATCH_SIZE,
+        )
+        invalidate_course_statistics(*course_ids)
+        return len(added)
+
+
+def rebalance_groups(*course_ids):
+    """Равномерное распределение студентов по группам курсов.
+
+    Без аргументов обрабатываются все курсы с подписками. Студенты без
+    группы распределяются, а из переполненных групп переносится
+    минимально необходимое количество студентов. Все курсы проходят
+    один раз: группы, студенты без группы и лишние студенты переполненных
+    групп (ROW_NUMBER() по группе) читаются одним запросом на пачку,
+    переносы применяются одним удалением и одним bulk_create.
+    Возвращает количество добавленных в группы записей.
+    """
+    through = Group.students.through
+    student_id = f"{student_field()}_id"
+    subscriptions = Subscription.objects.order_by()
+    if course_ids:
+        subscriptions = subscriptions.filter(course_id__in=course_ids)
+
+    with transaction.atomic():
+        course_ids = list(
+            subscriptions.values_list("course_id", flat=True).distinct()
+        )
+        if not course_ids:
+            return 0
+        for batch in batches(course_ids, BATCH_SIZE):
+            provision_groups(*batch)
+        subscribed = Q(course_id__in=subscriptions.values("course_id"))
+        refresh_student_counts(Group.objects.filter(subscribed).values("pk"))
+
+        # Больше всего студентов получают самые заполненные группы:
+        # так переносов меньше всего.
+        groups = defaultdict(list)
+        for group in (
+            Group.objects.select_for_update()
+            .filter(subscribed)
+            .order_by("course_id", "-student_count", "id")
+            .only("id", "course_id", "student_count")
+        ):
+            groups[group.course_id].append(group)
+        movers = defaultdict(list)
+        for course_id, user_id in subscriptions.exclude(
+            Exists(
+                through.objects.filter(
+                    group__course_id=OuterRef("course_id"),
+                    **{student_id: OuterRef("user_id")},
+                )
+            )
+        ).values_list("course_id", "user_id"):
+            movers[course_id].append(user_id)
+
+        surplus, courses = {}, {}
+        for course_id, course_groups in groups.items():
+            total = sum(group.student_count for group in course_groups)
+            base, extra = divmod(
+                total + len(movers[course_id]), len(course_groups)
+            )
+            for index, group in enumerate(course_groups):
+                group.target = base + (index < extra)
+                if group.student_count > group.target:
+                    surplus[group.id] = group.student_count - group.target
+                    courses[group.id] = course_id
+
+        removed = []
+        for batch in batches(surplus, BATCH_SIZE):
+            rows = (
+                through.objects.filter(group_id__in=batch)
+                .annotate(
+                    position=Window(
+                        RowNumber(),
+                        partition_by=F("group_id"),
+                        order_by=F("id").desc(),
+                    )
+                )
+                .filter(position__lte=max(surplus[pk] for pk in batch))
+                .values_list("id", "group_id", student_id, "position")
+            )
+            for row_id, group_id, user_id, position in rows:
+                if position <= surplus[group_id]:
+                    removed.append(row_id)
+                    movers[courses[group_id]].append(user_id)
+        for batch in batches(removed, BATCH_SIZE):
+            through.objects.filter(id__in=batch).delete()
+
+        added, changed = [], []
+        now = timezone.now()
+        for course_id, course_groups in groups.items():
+            for group in course_groups:
+                for _ in range(group.target - group.student_count):
+                    added.append(
+                        through(
+                            group_id=group.id,
+                            **{student_id: movers[course_id].pop()},
+                        )
+                    )
+                if group.student_count != group.target:
+                    group.student_count = group.target
+                    group.updated_at = now
+                    changed.append(group)
+        through.objects.bulk_create(added, batch_size=BATCH_SIZE)
+        Group.objects.bulk_update(
+            changed, ["student_count", "updated_at"], batch_size=BATCH_SIZE
+        )
+        invalidate_course_statistics(*course_ids)
+        invalidate_courses(*course_ids)
+        return len(added)
@@ -1,8 +1,40 @@
-from django.db.models import Count
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.db.models.functions import Now
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
 from django.dispatch import receiver
 from django.utils import timezone
+
+from courses.counters import (
+    adjust_course_counters,
+    count_created,
+    count_deleted,
+    is_batch_delete,
+)
+from courses.models import Course, Group, Lesson
+from courses.services import provision_groups, refresh_student_counts
+from courses.statistics import invalidate_course_statistics
+from users.dashboard import invalidate_courses
 from users.models import Subscription
+from users.querysets import (
+    subscriptions_bulk_created,
+    subscriptions_bulk_deleted,
+)
+
+COUNTER_FIELDS = {Lesson: "lessons_count", Subscription: "students_count"}
+
+
+@receiver(pre_save, sender=Course)
+def course_published(sender, instance: Course, **kwargs):
+    """Дата первого открытия курса, вручную или при создании."""
+
+    if instance.available and instance.published_at is None:
+        instance.published_at = timezone.now()
 
 
 @receiver(post_save, sender=Subscription)
@@ -10,11 +42,128 @@ def post_save_subscription(sender, instance: Subscription, created, **kwargs):
     """
     Распределение нового студента в группу курса.
 
+    Наименее заполненная группа выбирается одним запросом по
+    счетчику student_count с блокировкой строки до конца транзакции.
+    Группы курса создаются при первой подписке.
     """
 
     if created:
-        course = instance.course
-        groups = course.groups.all()
-        if groups:
-            least_filled_group = min(groups, key=lambda g: g.students.count())
+        with transaction.atomic():
+            groups = Group.objects.select_for_update().filter(
+                course_id=instance.course_id
+            ).order_by("student_count", "id")
+            least_filled_group = groups.first()
+            if least_filled_group is None:
+                provision_groups(instance.course_id)
+                least_filled_group = groups.first()
             least_filled_group.students.add(instance.user)
+
+
+@receiver(m2m_changed, sender=Group.students.through)
+def group_students_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Поддержка счетчика student_count при изменении состава групп."""
+
+    if action == "pre_clear" and reverse:
+        instance._cleared_group_ids = list(
+            instance.course_groups.values_list("pk", flat=True)
+        )
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        if action == "post_add":
+            # В post_add pk_set содержит только действительно добавленных.
+            Group.objects.filter(pk=instance.pk).update(
+                updated_at=Now(),
+                student_count=F("student_count") + len(pk_set),
+            )
+        else:
+            refresh_student_counts([instance.pk])
+        invalidate_course_statistics(instance.course_id)
+        return
+
+    if action == "post_clear":
+        group_ids = instance.__dict__.pop("_cleared_group_ids", [])
+    else:
+        group_ids = pk_set
+    refresh_student_counts(group_ids)
+    invalidate_course_statistics(
+        *Group.objects.filter(pk__in=group_ids)
+        .values_list("course_id", flat=True)
+        .distinct()
+    )
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=Subscription)
+def course_counter_created(sender, instance, created, **kwargs):
+    """Увеличение счетчика уроков или студентов курса."""
+
+    if created:
+        adjust_course_counters(
+            COUNTER_FIELDS[sender], {instance.course_id: 1}
+        )
+
+
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=Subscription)
+def course_counter_deleted(sender, instance, origin=None, **kwargs):
+    """Уменьшение счетчика уроков или студентов курса.
+
+    При удалении самого курса и при пакетном QuerySet.delete()
+    отдельные строки счетчик не меняют.
+    """
+
+    deleting_course = isinstance(origin, Course) or (
+        isinstance(origin, QuerySet) and origin.model is Course
+    )
+    if deleting_course or is_batch_delete(sender, origin):
+        return
+    adjust_course_counters(
+        COUNTER_FIELDS[sender], {instance.course_id: -1}
+    )
+
+
+@receiver(subscriptions_bulk_created)
+def subscriptions_created(sender, objs, conflicts, **kwargs):
+    """Счетчики студентов после bulk_create подписок."""
+
+    count_created(COUNTER_FIELDS[sender], objs, conflicts)
+
+
+@receiver(subscriptions_bulk_deleted)
+def subscriptions_deleted(sender, counts, **kwargs):
+    """Счетчики студентов после QuerySet.delete() подписок."""
+
+    count_deleted(COUNTER_FIELDS[sender], counts)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, origin=None, **kwargs):
+    """Удаление группы меняет дату изменения курса (валидатор каталога)."""
+
+    deleting_course = isinstance(origin, Course) or (
+        isinstance(origin, QuerySet) and origin.model is Course
+    )
+    if not deleting_course:
+        Course.objects.filter(pk=instance.course_id).update(updated_at=Now())
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def course_content_changed(sender, instance, **kwargs):
+    """Сброс кеша статистики курса при изменении его данных."""
+
+    invalidate_course_statistics(instance.course_id)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def course_structure_changed(sender, instance, **kwargs):
+    """Сброс кеша «мои курсы» студентов курса."""
+
+    invalidate_courses(instance.pk if sender is Course else instance.course_id)
@@ -0,0 +1,101 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from courses.models import STATISTICS_FIELDS, Course
+from product.cache import invalidate
+
+CACHE_TIMEOUT = 60 * 60
+KEY_PREFIX = "course-statistics"
+
+_lock = threading.Lock()
+_counters = {"hits": 0, "misses": 0}
+
+
+def _cache():
+    return caches[getattr(settings, "COURSE_STATISTICS_CACHE", "default")]
+
+
+def _key(course_id):
+    return f"{KEY_PREFIX}:{course_id}"
+
+
+def _count(hits, misses):
+    with _lock:
+        _counters["hits"] += hits
+        _counters["misses"] += misses
+
+
+def _statistics_query(course_ids):
+    return (
+        Course.objects.filter(pk__in=course_ids)
+        .with_statistics()
+        .order_by()
+        .values("id", *STATISTICS_FIELDS)
+    )
+
+
+def get_course_statistics(course_ids):
+    """Статистика курсов из кеша; промахи считаются одним запросом."""
+    cache = _cache()
+    keys = {_key(course_id): course_id for course_id in course_ids}
+    statistics = {
+        keys[key]: value for key, value in cache.get_many(keys).items()
+    }
+    missing = [
+        course_id for course_id in keys.values()
+        if course_id not in statistics
+    ]
+    _count(len(statistics), len(missing))
+    if missing:
+        computed = {row.pop("id"): row for row in _statistics_query(missing)}
+        cache.set_many(
+            {_key(course_id): row for course_id, row in computed.items()},
+            CACHE_TIMEOUT,
+        )
+        statistics.update(computed)
+    return statistics
+
+
+async def aget_course_statistics(course_ids):
+    """Асинхронный вариант get_course_statistics для async-представлений."""
+    cache = _cache()
+    keys = {_key(course_id): course_id for course_id in course_ids}
+    statistics = {
+        keys[key]: value
+        for key, value in (await cache.aget_many(keys)).items()
+    }
+    missing = [
+        course_id for course_id in keys.values()
+        if course_id not in statistics
+    ]
+    _count(len(statistics), len(missing))
+    if missing:
+        computed = {
+            row.pop("id"): row
+            async for row in _statistics_query(missing)
+        }
+        await cache.aset_many(
+            {_key(course_id): row for course_id, row in computed.items()},
+            CACHE_TIMEOUT,
+        )
+        statistics.update(computed)
+    return statistics
+
+
+def invalidate_course_statistics(*course_ids):
+    """Сброс статистики курсов: сразу и после фиксации транзакции."""
+    invalidate(_cache(), [_key(course_id) for course_id in course_ids])
+
+
+def statistics_cache_info():
+    """Количество попаданий и промахов кеша статистики в процессе."""
+    with _lock:
+        hits, misses = _counters["hits"], _counters["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total else 0,
+    }
@@ -0,0 +1,308 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.v1.permissions import purchase_course
+from courses.models import COURSE_GROUPS_COUNT, Course, Group, Lesson
+from courses.services import rebalance_groups
+from courses.statistics import get_course_statistics
+from users.models import Balance, Subscription
+
+User = get_user_model()
+
+
+def create_course(groups=10, price=100):
+    course = Course.objects.create(
+        author="Test Author",
+        title="Test Course",
+        start_date="2024-01-01T00:00:00Z",
+        price=price,
+        available=True,
+    )
+    for number in range(1, groups + 1):
+        Group.objects.create(title=f"Группа №{number}", course=course)
+    return course
+
+
+def create_users(count):
+    return [
+        User.objects.create_user(
+            username=f"user{number}",
+            email=f"user{number}@example.com",
+        )
+        for number in range(count)
+    ]
+
+
+class GroupAssignmentTest(TestCase):
+    def test_students_are_distributed_evenly(self):
+        course = create_course()
+        for user in create_users(25):
+            Subscription.objects.create(user=user, course=course)
+        counts = sorted(course.groups.values_list("student_count", flat=True))
+        self.assertEqual(counts, [2] * 5 + [3] * 5)
+        for group in course.groups.all():
+            self.assertEqual(group.students.count(), group.student_count)
+
+    def test_assignment_query_count_does_not_depend_on_groups(self):
+        user, other = create_users(2)
+        small, large = create_course(groups=2), create_course(groups=50)
+        with self.assertNumQueries(8):
+            Subscription.objects.create(user=user, course=small)
+        with self.assertNumQueries(8):
+            Subscription.objects.create(user=other, course=large)
+
+    def test_student_count_follows_membership_changes(self):
+        course = create_course(groups=2)
+        first, second = course.groups.order_by("id")
+        user, other = create_users(2)
+        first.students.add(user, other)
+        user.course_groups.add(second)
+        first.students.remove(other)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.student_count, second.student_count), (1, 1))
+        user.course_groups.clear()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.student_count, second.student_count), (0, 0))
+
+
+class GroupProvisioningTest(TestCase):
+    def test_first_subscription_creates_groups(self):
+        course = create_course(groups=0)
+        user, other = create_users(2)
+        Subscription.objects.create(user=user, course=course)
+        Subscription.objects.create(user=other, course=course)
+        self.assertEqual(course.groups.count(), COURSE_GROUPS_COUNT)
+        self.assertEqual(
+            sorted(course.groups.values_list("student_count", flat=True)),
+            [0] * 8 + [1] * 2,
+        )
+
+    def test_rebalance_moves_fewest_students(self):
+        course = create_course()
+        crowded = course.groups.order_by("id").first()
+        users = create_users(25)
+        Subscription.objects.bulk_create(
+            Subscription(user=user, course=course) for user in users
+        )
+        crowded.students.add(*users[:20])
+        moved = rebalance_groups(course.id)
+        self.assertEqual(moved, 22)
+        crowded.refresh_from_db()
+        self.assertEqual(crowded.student_count, 3)
+        self.assertEqual(
+            sorted(course.groups.values_list("student_count", flat=True)),
+            [2] * 5 + [3] * 5,
+        )
+        self.assertEqual(
+            Group.students.through.objects.filter(
+                group__course=course
+            ).count(),
+            25,
+        )
+
+    def test_rebalance_is_one_pass_over_all_courses(self):
+        users = create_users(12)
+
+        def crowd(count):
+            courses = [create_course() for _ in range(count)]
+            for course in courses:
+                Subscription.objects.bulk_create(
+                    Subscription(user=user, course=course) for user in users
+                )
+                course.groups.order_by("id").first().students.add(*users[:6])
+            with CaptureQueriesContext(connection) as queries:
+                rebalance_groups()
+            for course in courses:
+                self.assertEqual(
+                    sorted(course.groups.values_list("student_count", flat=True)),
+                    [1] * 8 + [2] * 2,
+                )
+            return len(queries)
+
+        self.assertEqual(crowd(2), crowd(5))
+
+    def test_rebalance_command_provisions_groups(self):
+        course = create_course(groups=0)
+        Subscription.objects.bulk_create(
+            Subscription(user=user, course=course) for user in create_users(12)
+        )
+        call_command("rebalance_groups", stdout=StringIO())
+        self.assertEqual(
+            sorted(course.groups.values_list("student_count", flat=True)),
+            [1] * 8 + [2] * 2,
+        )
+
+
+class CourseCountersTest(TestCase):
+    def create_lessons(self, course, count):
+        return [
+            Lesson.objects.create(
+                title=f"Lesson {number}",
+                link="https://example.com/",
+                course=course,
+            )
+            for number in range(count)
+        ]
+
+    def assertCounters(self, course, lessons, students):
+        course.refresh_from_db()
+        self.assertEqual(
+            (course.lessons_count, course.students_count), (lessons, students)
+        )
+
+    def test_instance_create_and_delete(self):
+        course = create_course(groups=1)
+        lessons = self.create_lessons(course, 3)
+        user, other = create_users(2)
+        subscription = Subscription.objects.create(user=user, course=course)
+        Subscription.objects.create(user=other, course=course)
+        self.assertCounters(course, 3, 2)
+        lessons[0].delete()
+        subscription.delete()
+        self.assertCounters(course, 2, 1)
+
+    def test_bulk_create_and_queryset_delete(self):
+        first, second = create_course(groups=1), create_course(groups=1)
+        users = create_users(3)
+        Subscription.objects.bulk_create(
+            Subscription(user=user, course=course)
+            for user in users
+            for course in (first, second)
+        )
+        Lesson.objects.bulk_create(
+            Lesson(title="Lesson", link="https://example.com/", course=first)
+            for _ in range(4)
+        )
+        self.assertCounters(first, 4, 3)
+        self.assertCounters(second, 0, 3)
+
+        with self.assertNumQueries(6):
+            Subscription.objects.filter(user__in=users[:2]).delete()
+        self.assertCounters(first, 4, 1)
+        self.assertCounters(second, 0, 1)
+
+    def test_bulk_create_ignoring_conflicts_recounts(self):
+        course = create_course(groups=1)
+        user, other = create_users(2)
+        Subscription.objects.create(user=user, course=course)
+        Subscription.objects.bulk_create(
+            [
+                Subscription(user=user, course=course),
+                Subscription(user=other, course=course),
+            ],
+            ignore_conflicts=True,
+        )
+        self.assertCounters(course, 0, 2)
+
+    def test_recount_command_repairs_drift(self):
+        course = create_course(groups=1)
+        self.create_lessons(course, 2)
+        Course.objects.update(lessons_count=7, students_count=3)
+        out = StringIO()
+        call_command("recount_courses", stdout=out)
+        self.assertIn("Courses recounted: 1", out.getvalue())
+        self.assertCounters(course, 2, 0)
+
+
+class PublicationSchedulerTest(TestCase):
+    def create_closed_course(self, start, **kwargs):
+        return Course.objects.create(
+            author="Test Author",
+            title="Test Course",
+            start_date=timezone.now() + start,
+            price=100,
+            available=False,
+            **kwargs,
+        )
+
+    def test_publishes_started_and_prepares_upcoming(self):
+        started = self.create_closed_course(timedelta(minutes=-5))
+        withdrawn = self.create_closed_course(
+            timedelta(days=-30), published_at=timezone.now()
+        )
+        upcoming = self.create_closed_course(timedelta(minutes=30))
+        later = self.create_closed_course(timedelta(days=1))
+        out = StringIO()
+        call_command("publish_courses", "--once", stdout=out)
+        self.assertIn("Courses published: 1, prepared: 1", out.getvalue())
+
+        self.assertEqual(
+            set(
+                Course.objects.filter(available=True).values_list(
+                    "pk", flat=True
+                )
+            ),
+            {started.pk},
+        )
+        for course, groups in (
+            (started, COURSE_GROUPS_COUNT),
+            (upcoming, COURSE_GROUPS_COUNT),
+            (withdrawn, 0),
+            (later, 0),
+        ):
+            self.assertEqual(course.groups.count(), groups)
+        with self.assertNumQueries(0):
+            statistics = get_course_statistics([started.pk, upcoming.pk])
+        self.assertEqual(
+            statistics[upcoming.pk]["groups_count"], COURSE_GROUPS_COUNT
+        )
+
+    def test_restart_keeps_withdrawn_courses_closed(self):
+        course = self.create_closed_course(timedelta(minutes=-5))
+        missed = self.create_closed_course(timedelta(days=-30))
+        call_command("publish_courses", "--once", stdout=StringIO())
+        course.refresh_from_db()
+        self.assertTrue(course.available)
+        self.assertIsNotNone(course.published_at)
+
+        course.available = False
+        course.save()
+        out = StringIO()
+        call_command("publish_courses", "--once", stdout=out)
+        self.assertEqual(out.getvalue(), "")
+        course.refresh_from_db()
+        missed.refresh_from_db()
+        self.assertFalse(course.available)
+        self.assertTrue(missed.available)
+
+    def test_manual_publication_is_recorded(self):
+        course = self.create_closed_course(timedelta(days=1))
+        self.assertIsNone(course.published_at)
+        course.available = True
+        course.save()
+        self.assertIsNotNone(course.published_at)
+
+    def test_lookup_uses_publication_index(self):
+        plan = Course.objects.filter(
+            available=False, published_at=None, start_date__lte=timezone.now()
+        ).order_by().explain()
+        self.assertIn("course_publication_idx", plan)
+
+
+class ConcurrentGroupAssignmentTest(TransactionTestCase):
+    def test_concurrent_buyers_are_distributed_evenly(self):
+        course = create_course()
+        users = create_users(30)
+        for user in users:
+            Balance.objects.create(user=user, amount=1000)
+
+        def purchase(user):
+            try:
+                purchase_course(user, course)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            list(executor.map(purchase, users))
+        counts = list(course.groups.values_list("student_count", flat=True))
+        self.assertEqual(counts, [3] * 10)
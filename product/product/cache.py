@@ -0,0 +1,11 @@
+from django.db import transaction
+
+
+def invalidate(cache, keys):
+    """Сброс ключей кеша сразу и повторно после фиксации транзакции.
+
+    Повторный сброс убирает значение, которое параллельный запрос мог
+    успеть закешировать по старым данным до фиксации.
+    """
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
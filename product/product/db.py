@@ -0,0 +1,67 @@
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+from itertools import islice
+
+from django.db import OperationalError, connection
+
+LOCK_RETRY_ATTEMPTS = 5
+LOCK_RETRY_DELAY = 0.05
+
+
+def batches(items, size):
+    """Списки по size элементов из любой последовательности или итератора."""
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+def retry_on_lock(func):
+    """Повтор транзакции, если SQLite ответил 'database is locked'.
+
+    Повторяется только внешняя транзакция: внутри чужого atomic()
+    откатить и начать заново нельзя.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(LOCK_RETRY_ATTEMPTS):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as error:
+                if (
+                    "locked" not in str(error)
+                    or connection.in_atomic_block
+                    or attempt == LOCK_RETRY_ATTEMPTS - 1
+                ):
+                    raise
+                time.sleep(LOCK_RETRY_DELAY * 2 ** attempt * random.random())
+
+    return wrapper
+
+
+_migrating = ContextVar("migrating_database", default=None)
+
+
+def start_migration(sender, using, **kwargs):
+    _migrating.set(using)
+
+
+def finish_migration(sender, using, **kwargs):
+    _migrating.set(None)
+
+
+class MigrationRouter:
+    """Запросы миграций данных идут в мигрируемую БД.
+
+    Модели из apps.get_model() в RunPython без явного using() пишут
+    в default; при ``migrate --database=target`` это дописывало бы
+    строки в рабочую БД. Алиас берется из сигнала pre_migrate.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _migrating.get()
+
+    def db_for_write(self, model, **hints):
+        return _migrating.get()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "api.middleware.QueryMetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -80,13 +82,96 @@ WSGI_APPLICATION = "product.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+
+def database_from_env(prefix, default_name):
+    """Настройки БД из переменных окружения с префиксом ``prefix``.
+
+    ``<prefix>ENGINE`` - sqlite3 (по умолчанию) или postgresql;
+    для PostgreSQL нужен пакет psycopg.
+    """
+    if os.environ.get(f"{prefix}ENGINE", "sqlite3") == "postgresql":
+        return {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get(f"{prefix}NAME", "product"),
+            "USER": os.environ.get(f"{prefix}USER", ""),
+            "PASSWORD": os.environ.get(f"{prefix}PASSWORD", ""),
+            "HOST": os.environ.get(f"{prefix}HOST", ""),
+            "PORT": os.environ.get(f"{prefix}PORT", ""),
+            "CONN_MAX_AGE": 600,
+            "CONN_HEALTH_CHECKS": True,
+        }
+    return {
+        "ENGINE": "product.sqlite3",
+        "NAME": os.environ.get(f"{prefix}NAME", default_name),
+        # Файловая тестовая БД: в памяти SQLite не ждет снятия блокировок,
+        # а тесты конкурентной оплаты работают из нескольких потоков.
+        "TEST": {"NAME": Path(default_name).with_name(
+            f"test_{Path(default_name).name}"
+        )},
+    }
+
+
 DATABASES = {
+    "default": database_from_env("DB_", BASE_DIR / "db.sqlite3"),
+    # БД назначения для команды copy_database.
+    "target": database_from_env("TARGET_DB_", BASE_DIR / "target.sqlite3"),
+}
+
+# Миграции данных пишут в ту БД, к которой применяется migrate.
+DATABASE_ROUTERS = ["product.db.MigrationRouter"]
+
+# Профиль production: WAL, постоянные соединения и BEGIN IMMEDIATE,
+# чтобы параллельные оплаты ждали блокировку, а не падали с
+# "database is locked".
+DATABASE_PROFILE = os.environ.get("DATABASE_PROFILE", "development")
+
+if (
+    DATABASE_PROFILE == "production"
+    and DATABASES["default"]["ENGINE"] == "product.sqlite3"
+):
+    DATABASES["default"].update(
+        {
+            "CONN_MAX_AGE": 600,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "timeout": 10,
+                "transaction_mode": "IMMEDIATE",
+                "pragmas": {
+                    "journal_mode": "WAL",
+                    "synchronous": "NORMAL",
+                    "busy_timeout": 10000,
+                    "mmap_size": 256 * 1024 * 1024,
+                    "cache_size": -64 * 1024,
+                    "temp_store": "MEMORY",
+                },
+            },
+        }
+    )
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
     }
 }
 
+# Алиас кеша статистики курсов. При нескольких процессах сервера
+# здесь нужен общий бэкенд (Redis, Memcached).
+COURSE_STATISTICS_CACHE = "default"
+
+# Алиас кеша страницы «мои курсы»; требования те же, что и выше.
+STUDENT_COURSES_CACHE = "default"
+
+# Очередь покупок: /pay/ списывает бонусы и отвечает 202, подписку
+# и группу создает команда process_purchases.
+PURCHASE_QUEUE_ENABLED = os.environ.get("PURCHASE_QUEUE_ENABLED", "0") == "1"
+
+# Замеры SQL и времени ответа API (заголовок Server-Timing, /api/v1/metrics/).
+API_METRICS_ENABLED = os.environ.get("API_METRICS_ENABLED", "0") == "1"
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -136,13 +221,26 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.v1.authentication.CachedTokenAuthentication",
         "rest_framework.authentication.BasicAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_PAGINATION_CLASS": "api.v1.pagination.ModelOrderingCursorPagination",
+    "PAGE_SIZE": 50,
 }
 
+# Basic-аутентификация проверяет пароль (PBKDF2) на каждом запросе,
+# поэтому в production доступны только токен и сессия.
+if DATABASE_PROFILE == "production":
+    REST_FRAMEWORK["DEFAULT_AUTHENTICATION_CLASSES"].remove(
+        "rest_framework.authentication.BasicAuthentication"
+    )
+
+# Кеш «токен → пользователь» в памяти процесса: размер и время жизни (с).
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL = int(os.environ.get("TOKEN_CACHE_TTL", 60))
+
 DJOSER = {
     "SERIALIZERS": {
         "user_create": "api.v1.serializers.user_serializer.CustomUserSerializer",
@@ -0,0 +1,45 @@
+"""
+Бэкенд SQLite с PRAGMA соединения и настраиваемым режимом BEGIN.
+
+Кроме стандартных, OPTIONS принимает два ключа:
+
+* ``pragmas`` - словарь, который применяется через ``PRAGMA name = value``
+  к каждому новому соединению (journal_mode, synchronous, busy_timeout, ...);
+* ``transaction_mode`` - ``DEFERRED``, ``IMMEDIATE`` или ``EXCLUSIVE``
+  для BEGIN, которым открываются блоки ``atomic()``.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = kwargs.pop("pragmas", {})
+        self.transaction_mode = kwargs.pop("transaction_mode", None)
+        if (
+            self.transaction_mode is not None
+            and self.transaction_mode.upper() not in TRANSACTION_MODES
+        ):
+            raise ImproperlyConfigured(
+                "settings.DATABASES transaction_mode must be one of "
+                f"{', '.join(TRANSACTION_MODES)}."
+            )
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        # BEGIN IMMEDIATE берет блокировку записи сразу: ожидание идет
+        # в busy_timeout, а не заканчивается ошибкой при повышении
+        # блокировки посреди транзакции.
+        if self.transaction_mode is None:
+            return super()._start_transaction_under_autocommit()
+        self.cursor().execute(f"BEGIN {self.transaction_mode}")
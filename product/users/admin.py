@@ -1,5 +1,13 @@
 from django.contrib import admin
-from .models import CustomUser, Balance, Subscription
+from django.db import transaction
+
+from .models import (
+    Balance,
+    BalanceTransaction,
+    CustomUser,
+    Purchase,
+    Subscription,
+)
 
 
 @admin.register(CustomUser)
@@ -8,6 +16,12 @@ class CustomUserAdmin(admin.ModelAdmin):
     search_fields = ("email", "first_name", "last_name")
     list_filter = ("is_staff", "is_superuser", "is_active")
 
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if not change:
+                Balance.objects.create(user=obj)
+
 
 @admin.register(Balance)
 class BalanceAdmin(admin.ModelAdmin):
@@ -15,9 +29,54 @@ class BalanceAdmin(admin.ModelAdmin):
     search_fields = ("user__email",)
     list_filter = ("amount",)
 
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        # Изменение баланса в админке записывается в журнал как
+        # начисление на разницу с текущим значением.
+        with transaction.atomic():
+            current = Balance.objects.select_for_update().get(pk=obj.pk)
+            super().save_model(request, obj, form, change)
+            if obj.amount != current.amount:
+                BalanceTransaction.objects.create(
+                    user_id=obj.user_id,
+                    kind=BalanceTransaction.CREDIT,
+                    amount=obj.amount - current.amount,
+                )
+
+
+@admin.register(BalanceTransaction)
+class BalanceTransactionAdmin(admin.ModelAdmin):
+    list_display = ("user", "kind", "amount", "course", "created_at")
+    search_fields = ("user__email",)
+    list_filter = ("kind", "created_at")
+    list_select_related = ("user", "course")
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ("user", "course", "subscribed_at")
     search_fields = ("user__email", "course__title")
     list_filter = ("subscribed_at",)
+
+
+@admin.register(Purchase)
+class PurchaseAdmin(admin.ModelAdmin):
+    list_display = (
+        "user", "course", "amount", "status", "created_at", "processed_at"
+    )
+    search_fields = ("user__email",)
+    list_filter = ("status", "created_at")
+    list_select_related = ("user", "course")
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
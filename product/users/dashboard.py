@@ -0,0 +1,72 @@
+"""
+Кеш страницы «мои курсы» студента.
+
+Запись кеша пользователя хранит готовый ответ и версии его курсов.
+Покупка или смена группы сбрасывает запись пользователя, а изменение
+уроков и групп курса меняет версию курса, и записи всех его студентов
+перестают совпадать без перебора подписчиков.
+"""
+
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+
+from product.cache import invalidate
+
+# Изменения без сигналов (QuerySet.update() уроков) видны не позже TTL.
+CACHE_TIMEOUT = 10 * 60
+VERSION_TIMEOUT = 24 * 60 * 60
+
+
+def _cache():
+    return caches[getattr(settings, "STUDENT_COURSES_CACHE", "default")]
+
+
+def _user_key(user_id):
+    return f"student-courses:{user_id}"
+
+
+def _course_key(course_id):
+    return f"student-courses:course:{course_id}"
+
+
+def _course_versions(course_ids):
+    keys = [_course_key(course_id) for course_id in course_ids]
+    cache = _cache()
+    versions = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, VERSION_TIMEOUT)
+        versions.update(missing)
+    return versions
+
+
+def get_student_courses(user_id):
+    """Сохраненный ответ или None, если он устарел."""
+    cache = _cache()
+    entry = cache.get(_user_key(user_id))
+    if entry is None:
+        return None
+    versions = entry["versions"]
+    if versions and cache.get_many(list(versions)) != versions:
+        return None
+    return entry["data"]
+
+
+def store_student_courses(user_id, data, course_ids):
+    _cache().set(
+        _user_key(user_id),
+        {"data": data, "versions": _course_versions(course_ids)},
+        CACHE_TIMEOUT,
+    )
+
+
+def invalidate_students(*user_ids):
+    """Сброс кеша пользователей: сразу и после фиксации транзакции."""
+    invalidate(_cache(), [_user_key(user_id) for user_id in user_ids])
+
+
+def invalidate_courses(*course_ids):
+    """Новая версия курсов: кеш всех их студентов перестает совпадать."""
+    invalidate(_cache(), [_course_key(course_id) for course_id in course_ids])
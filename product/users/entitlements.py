@@ -0,0 +1,51 @@
+"""
+Купленные курсы пользователя для проверки доступа к урокам.
+
+Множество идентификаторов курсов загружается одним запросом и хранится
+в кеше, поэтому проверка доступа в обычном случае не обращается к БД.
+"""
+
+from django.core.cache import cache
+
+from product.cache import invalidate
+from users.models import Subscription
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def _key(user_id):
+    return f"entitlements:{user_id}"
+
+
+def get_course_ids(user_id):
+    """Идентификаторы купленных курсов пользователя (frozenset)."""
+    course_ids = cache.get(_key(user_id))
+    if course_ids is None:
+        course_ids = frozenset(
+            Subscription.objects.filter(user_id=user_id).values_list(
+                "course_id", flat=True
+            )
+        )
+        cache.set(_key(user_id), course_ids, CACHE_TIMEOUT)
+    return course_ids
+
+
+async def aget_course_ids(user_id):
+    """Асинхронный вариант get_course_ids."""
+    course_ids = await cache.aget(_key(user_id))
+    if course_ids is None:
+        course_ids = frozenset(
+            [
+                course_id
+                async for course_id in Subscription.objects.filter(
+                    user_id=user_id
+                ).values_list("course_id", flat=True)
+            ]
+        )
+        await cache.aset(_key(user_id), course_ids, CACHE_TIMEOUT)
+    return course_ids
+
+
+def invalidate_entitlements(*user_ids):
+    """Сброс купленных курсов: сразу и после фиксации транзакции."""
+    invalidate(cache, [_key(user_id) for user_id in user_ids])
@@ -0,0 +1,142 @@
+import csv
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+
+from users.services import provision_users
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Импортирует пользователей с балансами из CSV или JSONL."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", help="Путь к файлу или '-' для стандартного ввода."
+        )
+        parser.add_argument(
+            "--format",
+            choices=("csv", "jsonl"),
+            help="Формат файла; по умолчанию определяется по расширению.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Количество пользователей, создаваемых одной пачкой.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or (
+            "csv" if path.endswith(".csv") else "jsonl"
+        )
+        stream = (
+            sys.stdin if path == "-"
+            else open(path, encoding="utf-8-sig", newline="")
+        )
+        self.counts = {"created": 0, "skipped": 0, "invalid": 0}
+        try:
+            batch = []
+            for number, row in self.read(stream, file_format):
+                batch.append((number, row))
+                if len(batch) == options["batch_size"]:
+                    self.flush(batch)
+                    batch = []
+            self.flush(batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Users created: {created}, skipped: {skipped}, "
+                "invalid: {invalid}".format(**self.counts)
+            )
+        )
+
+    def read(self, stream, file_format):
+        """Пары (номер строки файла, запись)."""
+        if file_format == "csv":
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as error:
+                raise CommandError(f"Line {number}: {error}")
+
+    def reject(self, number, message):
+        self.counts["invalid"] += 1
+        self.stderr.write(f"Line {number}: {message}")
+
+    def flush(self, rows):
+        """Создание пачки пользователей.
+
+        Уже существующие адреса и повторы адреса в файле пропускаются,
+        строки без адреса или с занятым именем пользователя выводятся
+        как ошибочные и не прерывают импорт.
+        """
+        if not rows:
+            return
+        by_email = {}
+        for number, row in rows:
+            email = User.objects.normalize_email(
+                (row.get("email") or "").strip()
+            )
+            try:
+                validate_email(email)
+            except ValidationError:
+                self.reject(number, f"invalid email {email!r}.")
+                continue
+            if email in by_email:
+                self.counts["skipped"] += 1
+                continue
+            by_email[email] = number, row
+
+        existing = set(
+            User.objects.filter(email__in=list(by_email)).values_list(
+                "email", flat=True
+            )
+        )
+        self.counts["skipped"] += len(existing)
+        candidates = {
+            email: (number, row, row.get("username") or email)
+            for email, (number, row) in by_email.items()
+            if email not in existing
+        }
+        taken = set(
+            User.objects.filter(
+                username__in=[item[2] for item in candidates.values()]
+            ).values_list("username", flat=True)
+        )
+
+        users = []
+        for email, (number, row, username) in candidates.items():
+            if username in taken:
+                self.reject(number, f"username {username!r} is already taken.")
+                continue
+            taken.add(username)
+            users.append(
+                User(
+                    email=email,
+                    username=username,
+                    first_name=row.get("first_name") or "",
+                    last_name=row.get("last_name") or "",
+                    password=(
+                        make_password(row["password"])
+                        if row.get("password") else ""
+                    ),
+                )
+            )
+        provision_users(users)
+        self.counts["created"] += len(users)
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.purchases import process_purchases
+
+
+class Command(BaseCommand):
+    help = (
+        "Обрабатывает очередь покупок: создает подписки и зачисляет "
+        "студентов в группы пачками."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Количество покупок, обрабатываемых одной транзакцией.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Пауза при пустой очереди, секунды.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Обработать очередь и завершиться.",
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        try:
+            while True:
+                count = process_purchases(options["batch_size"])
+                processed += count
+                if count:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            self.style.SUCCESS(f"Purchases processed: {processed}")
+        )
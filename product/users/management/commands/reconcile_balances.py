@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from users.models import Balance, BalanceTransaction
+
+
+class Command(BaseCommand):
+    help = "Сверяет балансы пользователей с суммой журнала операций."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Количество балансов, сверяемых одним запросом.",
+        )
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Записать в баланс сумму журнала при расхождении.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        checked = mismatched = 0
+        last_user_id = 0
+        while True:
+            # Постраничный проход по user_id: в памяти только одна пачка.
+            balances = list(
+                Balance.objects.filter(user_id__gt=last_user_id)
+                .order_by("user_id")
+                .values_list("user_id", "amount")[:chunk_size]
+            )
+            if not balances:
+                break
+            first_user_id, last_user_id = balances[0][0], balances[-1][0]
+            totals = dict(
+                BalanceTransaction.objects.filter(
+                    user_id__gte=first_user_id, user_id__lte=last_user_id
+                )
+                .order_by()
+                .values("user_id")
+                .annotate(total=Sum("amount"))
+                .values_list("user_id", "total")
+            )
+            for user_id, amount in balances:
+                total = totals.get(user_id) or 0
+                if round(total - amount, 2) == 0:
+                    continue
+                mismatched += 1
+                self.stdout.write(
+                    f"User {user_id}: balance {amount}, ledger {total}"
+                )
+                if options["fix"]:
+                    self.fix(user_id)
+            checked += len(balances)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Balances checked: {checked}, mismatched: {mismatched}"
+            )
+        )
+
+    def fix(self, user_id):
+        with transaction.atomic():
+            balance = Balance.objects.select_for_update().get(user_id=user_id)
+            balance.amount = BalanceTransaction.objects.filter(
+                user_id=user_id
+            ).aggregate(total=Sum("amount"))["total"] or 0
+            balance.save(update_fields=("amount",))
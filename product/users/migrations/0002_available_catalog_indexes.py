@@ -0,0 +1,19 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                fields=["user", "course"], name="subscription_user_course_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:03
+
+import logging
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+logger = logging.getLogger(__name__)
+
+
+def remove_duplicate_subscriptions(apps, schema_editor):
+    # Повторные подписки на курс оставлены двойной оплатой: остается
+    # первая подписка, стоимость остальных возвращается на баланс.
+    Subscription = apps.get_model("users", "Subscription")
+    Balance = apps.get_model("users", "Balance")
+    duplicates = (
+        Subscription.objects.order_by()
+        .values("user", "course")
+        .annotate(first=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    refunds = defaultdict(int)
+    for pair in duplicates:
+        extra = Subscription.objects.filter(
+            user_id=pair["user"], course_id=pair["course"], id__gt=pair["first"]
+        ).select_related("course")
+        for subscription in extra:
+            refunds[subscription.user_id] += subscription.course.price
+            logger.warning(
+                "Duplicate subscription %s removed: user %s, course %s, " "refunded %s",
+                subscription.pk,
+                subscription.user_id,
+                subscription.course_id,
+                subscription.course.price,
+            )
+        extra.delete()
+    for user_id, amount in refunds.items():
+        Balance.objects.filter(user_id=user_id).update(
+            amount=models.F("amount") + amount
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_available_catalog_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_subscriptions, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="subscription",
+            name="subscription_user_course_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="subscription",
+            constraint=models.UniqueConstraint(
+                fields=("user", "course"), name="unique_user_course_subscription"
+            ),
+        ),
+    ]
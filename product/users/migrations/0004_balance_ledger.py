@@ -0,0 +1,100 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def open_ledger(apps, schema_editor):
+    """Начальная операция журнала для каждого существующего баланса."""
+    Balance = apps.get_model("users", "Balance")
+    BalanceTransaction = apps.get_model("users", "BalanceTransaction")
+    batch = []
+    for user_id, amount in Balance.objects.values_list(
+        "user_id", "amount"
+    ).iterator(chunk_size=2000):
+        batch.append(
+            BalanceTransaction(user_id=user_id, kind="opening", amount=amount)
+        )
+        if len(batch) == 2000:
+            BalanceTransaction.objects.bulk_create(batch)
+            batch = []
+    BalanceTransaction.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0004_group_student_count"),
+        ("users", "0003_unique_subscription"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BalanceTransaction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("opening", "Начальный баланс"),
+                            ("credit", "Начисление"),
+                            ("purchase", "Покупка курса"),
+                        ],
+                        max_length=16,
+                        verbose_name="Тип операции",
+                    ),
+                ),
+                (
+                    "amount",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="Сумма"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата операции"
+                    ),
+                ),
+                (
+                    "course",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="balance_transactions",
+                        to="courses.course",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="balance_transactions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Операция по балансу",
+                "verbose_name_plural": "Операции по балансу",
+                "ordering": ("-id",),
+                "indexes": [
+                    models.Index(
+                        fields=["user", "amount"], name="balance_txn_user_amount_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
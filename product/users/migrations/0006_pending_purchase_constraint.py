@@ -0,0 +1,25 @@
+# Generated by Django 4.2.10 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_purchase_queue"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="purchase",
+            name="unique_active_purchase",
+        ),
+        migrations.AddConstraint(
+            model_name="purchase",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "pending")),
+                fields=("user", "course"),
+                name="unique_pending_purchase",
+            ),
+        ),
+    ]
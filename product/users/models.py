@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from users.querysets import SubscriptionQuerySet
+
 
 class CustomUser(AbstractUser):
     """Кастомная модель пользователя - студента."""
@@ -57,10 +59,148 @@ class Subscription(models.Model):
         auto_now_add=True, verbose_name="Дата подписки"
     )
 
+    objects = SubscriptionQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
         ordering = ("-id",)
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "course"),
+                name="unique_user_course_subscription",
+            ),
+        )
 
     def __str__(self):
         return f"{self.user.email} - {self.course.title}"
+
+
+class BalanceTransaction(models.Model):
+    """Модель операции по балансу пользователя.
+
+    Журнал только пополняется; Balance.amount хранит его текущую сумму.
+    """
+
+    OPENING = "opening"
+    CREDIT = "credit"
+    PURCHASE = "purchase"
+    KINDS = (
+        (OPENING, "Начальный баланс"),
+        (CREDIT, "Начисление"),
+        (PURCHASE, "Покупка курса"),
+    )
+
+    user = models.ForeignKey(
+        CustomUser,
+        related_name="balance_transactions",
+        on_delete=models.CASCADE
+    )
+
+    kind = models.CharField(
+        max_length=16, choices=KINDS, verbose_name="Тип операции"
+    )
+
+    amount = models.DecimalField(
+        max_digits=10, decimal_places=2, verbose_name="Сумма"
+    )
+
+    course = models.ForeignKey(
+        "courses.Course",
+        related_name="balance_transactions",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="Дата операции"
+    )
+
+    class Meta:
+        verbose_name = "Операция по балансу"
+        verbose_name_plural = "Операции по балансу"
+        ordering = ("-id",)
+        indexes = (
+            models.Index(
+                fields=("user", "amount"),
+                name="balance_txn_user_amount_idx",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.user_id} {self.kind} {self.amount}"
+
+
+class Purchase(models.Model):
+    """Модель покупки курса в очереди на обработку.
+
+    Баланс списывается сразу при постановке в очередь, подписку и
+    зачисление в группу создает обработчик process_purchases.
+    """
+
+    PENDING = "pending"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    STATUSES = (
+        (PENDING, "В очереди"),
+        (COMPLETED, "Выполнена"),
+        (FAILED, "Отклонена"),
+    )
+
+    user = models.ForeignKey(
+        CustomUser, related_name="purchases", on_delete=models.CASCADE
+    )
+
+    course = models.ForeignKey(
+        "courses.Course",
+        related_name="purchases",
+        on_delete=models.CASCADE
+    )
+
+    amount = models.DecimalField(
+        max_digits=10, decimal_places=2, verbose_name="Сумма"
+    )
+
+    status = models.CharField(
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name="Статус"
+    )
+
+    error = models.CharField(
+        max_length=250, blank=True, verbose_name="Причина отказа"
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="Дата покупки"
+    )
+
+    processed_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Дата обработки"
+    )
+
+    class Meta:
+        verbose_name = "Покупка"
+        verbose_name_plural = "Покупки"
+        ordering = ("-id",)
+        constraints = (
+            # Одна покупка курса в очереди; после удаления подписки
+            # курс можно купить снова.
+            models.UniqueConstraint(
+                fields=("user", "course"),
+                condition=models.Q(status="pending"),
+                name="unique_pending_purchase",
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=("id",),
+                condition=models.Q(status="pending"),
+                name="purchase_pending_idx",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.user_id} {self.course_id} {self.status}"
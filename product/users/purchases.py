@@ -0,0 +1,185 @@
+"""
+Очередь покупок курсов для пиковой нагрузки на /pay/.
+
+Запрос только списывает бонусы и ставит покупку в очередь; подписки,
+группы и счетчики курса обновляет обработчик пачками, поэтому запросы
+не ждут друг друга на строках популярного курса.
+"""
+
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Subquery
+from django.db.models.functions import Now
+from rest_framework.exceptions import ValidationError
+
+from courses.models import Course
+from courses.services import enroll_students
+from product.db import retry_on_lock
+from users.dashboard import invalidate_students
+from users.entitlements import invalidate_entitlements
+from users.services import credit_balances
+from users.models import Balance, BalanceTransaction, Purchase, Subscription
+
+ALREADY_PURCHASED = "The course has already been purchased."
+COURSE_NOT_AVAILABLE = "The course is not available for purchase."
+
+
+def debit_course(user, course):
+    """Списание цены открытого курса в текущей транзакции.
+
+    Цена и доступность берутся подзапросом в том же UPDATE баланса:
+    курс, закрытый планировщиком или администратором, не продается,
+    а изменение цены не приводит к списанию старой. Возвращает цену.
+    """
+    price = Course.objects.filter(pk=course.pk, available=True).values("price")
+    debited = Balance.objects.filter(
+        user=user, amount__gte=Subquery(price)
+    ).update(amount=F("amount") - Subquery(price))
+    # После UPDATE транзакция держит блокировку записи, и курс
+    # читается в том же состоянии, что видел подзапрос.
+    state = (
+        Course.objects.filter(pk=course.pk)
+        .values_list("available", "price")
+        .first()
+    )
+    if state is None or not state[0]:
+        raise ValidationError(COURSE_NOT_AVAILABLE)
+    if not debited:
+        raise ValidationError("Insufficient balance to purchase the course.")
+    BalanceTransaction.objects.create(
+        user=user,
+        kind=BalanceTransaction.PURCHASE,
+        amount=-state[1],
+        course=course,
+    )
+    return state[1]
+
+
+@retry_on_lock
+def reserve_purchase(user, course):
+    """Списание бонусов и постановка покупки курса в очередь."""
+    if Subscription.objects.filter(user=user, course=course).exists():
+        raise ValidationError(ALREADY_PURCHASED)
+    try:
+        with transaction.atomic():
+            price = debit_course(user, course)
+            return Purchase.objects.create(
+                user=user, course=course, amount=price
+            )
+    except IntegrityError:
+        raise ValidationError(ALREADY_PURCHASED)
+
+
+def _refund(purchases):
+    """Возврат бонусов за покупки, отклоненные обработчиком."""
+    amounts = defaultdict(int)
+    for purchase in purchases:
+        amounts[purchase.user_id] += purchase.amount
+    credit_balances(list(amounts.items()))
+    BalanceTransaction.objects.bulk_create(
+        BalanceTransaction(
+            user_id=purchase.user_id,
+            kind=BalanceTransaction.CREDIT,
+            amount=purchase.amount,
+            course_id=purchase.course_id,
+        )
+        for purchase in purchases
+    )
+
+
+def _subscribed(purchases):
+    """Пары (пользователь, курс) покупок, на которые уже есть подписка."""
+    return set(
+        Subscription.objects.filter(
+            user_id__in={purchase.user_id for purchase in purchases},
+            course_id__in={purchase.course_id for purchase in purchases},
+        ).values_list("user_id", "course_id")
+    )
+
+
+@retry_on_lock
+def process_purchases(batch_size=500):
+    """Обработка пачки покупок из очереди в одной транзакции.
+
+    Подписки создаются одним bulk_create (счетчики курсов обновляются
+    одним UPDATE на курс), студенты зачисляются в группы пачкой.
+    Покупка курса, уже купленного другим способом или закрытого после
+    постановки в очередь, отклоняется с возвратом бонусов.
+    Возвращает количество обработанных покупок.
+    """
+    with transaction.atomic():
+        purchases = list(
+            Purchase.objects.select_for_update(skip_locked=True)
+            .filter(status=Purchase.PENDING)
+            .order_by("id")[:batch_size]
+        )
+        if not purchases:
+            return 0
+
+        subscribed = _subscribed(purchases)
+        closed = set(
+            Course.objects.filter(
+                pk__in={purchase.course_id for purchase in purchases},
+                available=False,
+            ).values_list("pk", flat=True)
+        )
+        accepted, rejected = [], defaultdict(list)
+        for purchase in purchases:
+            if purchase.course_id in closed:
+                rejected[COURSE_NOT_AVAILABLE].append(purchase)
+            elif (purchase.user_id, purchase.course_id) in subscribed:
+                rejected[ALREADY_PURCHASED].append(purchase)
+            else:
+                accepted.append(purchase)
+
+        while accepted:
+            try:
+                # bulk_create не отправляет post_save: группы назначаются ниже.
+                with transaction.atomic():
+                    Subscription.objects.bulk_create(
+                        Subscription(
+                            user_id=purchase.user_id,
+                            course_id=purchase.course_id,
+                        )
+                        for purchase in accepted
+                    )
+                break
+            except IntegrityError:
+                # Курс купили через /pay/ или корзину после проверки выше:
+                # такие покупки отклоняются, остальные вставляются заново.
+                subscribed = _subscribed(accepted)
+                conflicts = [
+                    purchase
+                    for purchase in accepted
+                    if (purchase.user_id, purchase.course_id) in subscribed
+                ]
+                if not conflicts:
+                    raise
+                rejected[ALREADY_PURCHASED].extend(conflicts)
+                accepted = [
+                    purchase
+                    for purchase in accepted
+                    if (purchase.user_id, purchase.course_id) not in subscribed
+                ]
+
+        students_by_course = defaultdict(list)
+        for purchase in accepted:
+            students_by_course[purchase.course_id].append(purchase.user_id)
+        if students_by_course:
+            enroll_students(students_by_course)
+
+        Purchase.objects.filter(pk__in=[p.pk for p in accepted]).update(
+            status=Purchase.COMPLETED, processed_at=Now()
+        )
+        if rejected:
+            _refund([p for failed in rejected.values() for p in failed])
+        for error, failed in rejected.items():
+            Purchase.objects.filter(pk__in=[p.pk for p in failed]).update(
+                status=Purchase.FAILED, error=error, processed_at=Now()
+            )
+
+        user_ids = {purchase.user_id for purchase in purchases}
+        invalidate_students(*user_ids)
+        invalidate_entitlements(*user_ids)
+        return len(purchases)
@@ -0,0 +1,40 @@
+from django.db import models, transaction
+from django.dispatch import Signal
+
+# Пакетные изменения подписок. Счетчики студентов курсов по ним
+# обновляет приложение courses.
+subscriptions_bulk_created = Signal()
+subscriptions_bulk_deleted = Signal()
+
+
+class SubscriptionQuerySet(models.QuerySet):
+    """Запросы подписок.
+
+    bulk_create не отправляет post_save, а delete() сообщает об
+    удаленных строках сгруппированно по курсам одним сигналом.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        subscriptions_bulk_created.send(
+            sender=self.model,
+            objs=objs,
+            conflicts=bool(
+                kwargs.get("ignore_conflicts") or kwargs.get("update_conflicts")
+            ),
+        )
+        return objs
+
+    def delete(self):
+        counts = dict(
+            self.order_by()
+            .values_list("course_id")
+            .annotate(total=models.Count("pk"))
+        )
+        with transaction.atomic(using=self.db):
+            result = super().delete()
+            subscriptions_bulk_deleted.send(sender=self.model, counts=counts)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
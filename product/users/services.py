@@ -0,0 +1,117 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from rest_framework.exceptions import ValidationError
+
+from product.db import batches
+from users.models import Balance, BalanceTransaction
+
+User = get_user_model()
+
+# Пользователь попадает в UPDATE ... CASE дважды (в WHERE и в WHEN),
+# пачка укладывается в ограничение SQLite на количество параметров.
+BATCH_SIZE = 400
+
+
+def provision_user(**fields):
+    """Создание пользователя вместе с балансом в одной транзакции."""
+    with transaction.atomic():
+        user = User.objects.create_user(**fields)
+        Balance.objects.create(user=user)
+    return user
+
+
+def provision_users(users):
+    """Создание пачки пользователей с балансами через bulk_create.
+
+    Сигналы при bulk_create не срабатывают, поэтому балансы и
+    начальные операции журнала создаются здесь же, тоже пачками.
+    Пользователи без пароля получают неиспользуемый пароль.
+    """
+    users = list(users)
+    for user in users:
+        if not user.password:
+            user.set_unusable_password()
+    with transaction.atomic():
+        users = User.objects.bulk_create(users)
+        balances = Balance.objects.bulk_create(
+            Balance(user_id=user.pk) for user in users
+        )
+        BalanceTransaction.objects.bulk_create(
+            BalanceTransaction(
+                user_id=balance.user_id,
+                kind=BalanceTransaction.OPENING,
+                amount=balance.amount,
+            )
+            for balance in balances
+        )
+    return users
+
+
+def credit_balances(credits):
+    """Начисление сумм на балансы: один UPDATE ... CASE на пачку.
+
+    credits - список пар (user_id, amount) без повторов пользователей,
+    операции журнала пишет вызывающий код. Возвращает количество
+    обновленных балансов.
+    """
+    updated = 0
+    for batch in batches(credits, BATCH_SIZE):
+        # Одна ветка CASE на каждую сумму: в промоакциях их немного.
+        users_by_amount = defaultdict(list)
+        for user_id, amount in batch:
+            users_by_amount[amount].append(user_id)
+        updated += Balance.objects.filter(
+            user_id__in=[user_id for user_id, _ in batch]
+        ).update(
+            amount=Case(
+                *(
+                    When(
+                        user_id__in=credited,
+                        then=F("amount") + Value(amount),
+                    )
+                    for amount, credited in users_by_amount.items()
+                ),
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            )
+        )
+    return updated
+
+
+def bulk_credit(amounts_by_email):
+    """Начисление бонусов списку пользователей в одной транзакции.
+
+    Балансы обновляются пачками одним UPDATE ... CASE на пачку,
+    операции журнала пишутся через bulk_create.
+    Возвращает количество пользователей, которым начислены бонусы.
+    """
+    emails = list(amounts_by_email)
+    user_ids = {}
+    for batch in batches(emails, 900):
+        user_ids.update(
+            User.objects.filter(email__in=batch).values_list("email", "id")
+        )
+    unknown = [email for email in emails if email not in user_ids]
+    if unknown:
+        raise ValidationError({"unknown_emails": unknown[:100]})
+
+    credits = [
+        (user_ids[email], amount) for email, amount in amounts_by_email.items()
+    ]
+    with transaction.atomic():
+        updated = credit_balances(credits)
+        if updated != len(credits):
+            raise ValidationError("Some users have no balance.")
+        BalanceTransaction.objects.bulk_create(
+            (
+                BalanceTransaction(
+                    user_id=user_id,
+                    kind=BalanceTransaction.CREDIT,
+                    amount=amount,
+                )
+                for user_id, amount in credits
+            )
+        )
+    return len(credits)
@@ -0,0 +1,42 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from courses.models import Group
+from users.dashboard import invalidate_courses, invalidate_students
+from users.entitlements import invalidate_entitlements
+from users.models import Balance, BalanceTransaction, Subscription
+
+
+@receiver(post_save, sender=Balance)
+def post_save_balance(sender, instance: Balance, created, **kwargs):
+    """Запись начального баланса в журнал операций."""
+
+    if created:
+        BalanceTransaction.objects.create(
+            user_id=instance.user_id,
+            kind=BalanceTransaction.OPENING,
+            amount=instance.amount,
+        )
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def subscription_changed(sender, instance, **kwargs):
+    """Сброс кешей купленных курсов при покупке или удалении подписки."""
+
+    invalidate_students(instance.user_id)
+    invalidate_entitlements(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Group.students.through)
+def group_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Сброс кеша «мои курсы» студентов, сменивших группу."""
+
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        invalidate_students(instance.pk)
+    elif pk_set:
+        invalidate_students(*pk_set)
+    else:
+        invalidate_courses(instance.course_id)
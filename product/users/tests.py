@@ -1,12 +1,39 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from importlib import import_module
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest.mock import patch
+
+from django.apps import apps as django_apps
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
-from users.models import Balance, Subscription
-from courses.models import Course
+from users.models import Balance, BalanceTransaction, Purchase, Subscription
+from users.services import provision_users
+from courses.models import Course, Group, Lesson
+from courses.checks import search_index_check
+from courses.statistics import statistics_cache_info
+from api.metrics import route_metrics
+from api.v1.authentication import token_cache
+from benchmarks import scenarios
+from benchmarks.seed import seed
 
 from django.urls import reverse
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 
+from api.v1.permissions import purchase_course
+from product.db import finish_migration, retry_on_lock, start_migration
+from product.sqlite3.base import DatabaseWrapper
 from api.v1.serializers.user_serializer import (
     CustomUserSerializer,
     SubscriptionSerializer,
@@ -41,6 +68,127 @@ class BalanceModelTest(TestCase):
         self.assertEqual(balance.amount, 1000)
 
 
+class BalanceLedgerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass"
+        )
+        self.balance = Balance.objects.create(user=self.user, amount=1000)
+        self.course = Course.objects.create(
+            author="Test Author",
+            title="Test Course",
+            start_date="2024-01-01T00:00:00Z",
+            price=100,
+            available=True,
+        )
+
+    def test_purchase_is_recorded_in_ledger(self):
+        purchase_course(self.user, self.course)
+        self.assertEqual(
+            list(
+                BalanceTransaction.objects.order_by("id").values_list(
+                    "kind", "amount"
+                )
+            ),
+            [
+                (BalanceTransaction.OPENING, 1000),
+                (BalanceTransaction.PURCHASE, -100),
+            ],
+        )
+
+    def test_reconcile_balances(self):
+        purchase_course(self.user, self.course)
+        out = StringIO()
+        call_command("reconcile_balances", stdout=out)
+        self.assertIn("mismatched: 0", out.getvalue())
+
+        Balance.objects.filter(pk=self.balance.pk).update(amount=5)
+        out = StringIO()
+        call_command("reconcile_balances", "--fix", stdout=out)
+        self.assertIn("mismatched: 1", out.getvalue())
+        self.balance.refresh_from_db()
+        self.assertEqual(self.balance.amount, 900)
+
+
+class UserProvisioningTest(TestCase):
+    def test_registration_creates_balance(self):
+        serializer = CustomUserSerializer(data={
+            "username": "testuser",
+            "email": "testuser@example.com",
+            "password": "testpass",
+        })
+        self.assertTrue(serializer.is_valid())
+        user = serializer.save()
+        self.assertEqual(user.balance.amount, 1000)
+        self.assertEqual(user.balance_transactions.get().amount, 1000)
+
+    def test_provision_users_in_batches(self):
+        users = [
+            User(username=f"user{number}", email=f"user{number}@example.com")
+            for number in range(300)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            provision_users(users)
+        self.assertLess(len(queries), 15)
+        self.assertEqual(Balance.objects.count(), 300)
+        self.assertEqual(BalanceTransaction.objects.count(), 300)
+
+    def test_import_users_command(self):
+        User.objects.create_user(
+            username="existing",
+            email="existing@example.com",
+            password="testpass"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "users.jsonl")
+            with open(path, "w") as stream:
+                for email in ("a@example.com", "existing@example.com"):
+                    stream.write(json.dumps({"email": email}) + "\n")
+                stream.write(json.dumps({
+                    "email": "b@example.com",
+                    "first_name": "Иван",
+                    "password": "secret",
+                }) + "\n")
+            out = StringIO()
+            call_command("import_users", path, "--batch-size", "2", stdout=out)
+        self.assertIn("created: 2, skipped: 1", out.getvalue())
+        imported = User.objects.get(email="b@example.com")
+        self.assertEqual(imported.first_name, "Иван")
+        self.assertTrue(imported.check_password("secret"))
+        self.assertFalse(
+            User.objects.get(email="a@example.com").has_usable_password()
+        )
+        self.assertEqual(Balance.objects.count(), 2)
+
+    def test_import_users_reports_bad_rows(self):
+        rows = (
+            {"email": "a@example.com", "username": "same"},
+            {"email": "A@example.com"},
+            {"email": "a@example.com", "first_name": "Повтор"},
+            {"email": "b@example.com", "username": "same"},
+            {"username": "nobody"},
+            {"email": "c@example.com"},
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "users.jsonl")
+            with open(path, "w") as stream:
+                for row in rows:
+                    stream.write(json.dumps(row) + "\n")
+            out, err = StringIO(), StringIO()
+            call_command(
+                "import_users", path, "--batch-size", "10",
+                stdout=out, stderr=err,
+            )
+        self.assertIn("created: 3, skipped: 1, invalid: 2", out.getvalue())
+        self.assertIn("Line 4: username 'same' is already taken.", err.getvalue())
+        self.assertIn("Line 5: invalid email ''.", err.getvalue())
+        self.assertEqual(
+            User.objects.get(email="a@example.com").first_name, ""
+        )
+
+
 class SubscriptionModelTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -102,7 +250,7 @@ class CourseViewSetTest(APITestCase):
         url = reverse("courses-list")
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreater(len(response.data), 0)
+        self.assertGreater(len(response.data["results"]), 0)
 
     def test_pay_for_course(self):
         url = reverse("courses-pay", args=[self.course.id])
@@ -127,6 +275,1364 @@ class CourseViewSetTest(APITestCase):
                 course=self.course).exists()
         )
 
+    def test_closed_course_cannot_be_bought(self):
+        Course.objects.filter(pk=self.course.pk).update(available=False)
+        url = reverse("courses-pay", args=[self.course.id])
+        for queued in (False, True):
+            with override_settings(PURCHASE_QUEUE_ENABLED=queued):
+                response = self.client.post(url)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("not available", response.data["error"])
+        self.assertFalse(Subscription.objects.exists())
+        self.assertFalse(Purchase.objects.exists())
+        self.assertEqual(Balance.objects.get(user=self.user).amount, 1000)
+
+
+class PaymentIdempotencyTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(
+            author="Test Author",
+            title="Test Course",
+            start_date="2024-01-01T00:00:00Z",
+            price=100,
+            available=True,
+        )
+        self.balance = Balance.objects.create(user=self.user, amount=1000)
+        self.url = reverse("courses-pay", args=[self.course.id])
+
+    def test_retry_with_same_key_is_not_charged_twice(self):
+        first = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY="abc")
+        second = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY="abc")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(Balance.objects.get(user=self.user).amount, 900)
+
+    def test_repeated_purchase_is_rejected(self):
+        self.client.post(self.url)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Balance.objects.get(user=self.user).amount, 900)
+        self.assertEqual(Subscription.objects.count(), 1)
+
+
+class CheckoutTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.balance = Balance.objects.create(user=self.user, amount=1000)
+        self.url = reverse("checkout-list")
+
+    def create_courses(self, count, price=100):
+        return [
+            Course.objects.create(
+                author="Test Author",
+                title=f"Test Course {number}",
+                start_date="2024-01-01T00:00:00Z",
+                price=price,
+                available=True,
+            )
+            for number in range(count)
+        ]
+
+    def test_checkout_debits_once_and_assigns_groups(self):
+        courses = self.create_courses(3)
+        response = self.client.post(
+            self.url, {"course_ids": [course.id for course in courses]},
+            format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["subscriptions"]), 3)
+        self.assertEqual(Balance.objects.get(user=self.user).amount, 700)
+        self.assertEqual(
+            BalanceTransaction.objects.filter(
+                user=self.user, kind=BalanceTransaction.PURCHASE
+            ).count(),
+            3,
+        )
+        for course in courses:
+            groups = course.groups.filter(students=self.user)
+            self.assertEqual(groups.count(), 1)
+            self.assertEqual(groups.get().student_count, 1)
+
+    def test_insufficient_balance_changes_nothing(self):
+        courses = self.create_courses(3, price=400)
+        response = self.client.post(
+            self.url, {"course_ids": [course.id for course in courses]},
+            format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Balance.objects.get(user=self.user).amount, 1000)
+        self.assertFalse(Subscription.objects.exists())
+
+    def test_purchased_course_rejects_basket(self):
+        courses = self.create_courses(2)
+        purchase_course(self.user, courses[0])
+        response = self.client.post(
+            self.url, {"course_ids": [course.id for course in courses]},
+            format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Balance.objects.get(user=self.user).amount, 900)
+        self.assertEqual(Subscription.objects.count(), 1)
+
+    def test_closed_course_cannot_be_bought(self):
+        courses = self.create_courses(2)
+        Course.objects.filter(pk=courses[1].pk).update(available=False)
+        response = self.client.post(
+            self.url, {"course_ids": [course.id for course in courses]},
+            format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Balance.objects.get(user=self.user).amount, 1000)
+        self.assertFalse(Subscription.objects.exists())
+
+    def test_query_count_does_not_depend_on_basket_size(self):
+        small, large = self.create_courses(2, price=1), self.create_courses(8, price=1)
+        counts = []
+        for basket in (small, large):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    self.url, {"course_ids": [course.id for course in basket]},
+                    format="json"
+                )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+@override_settings(PURCHASE_QUEUE_ENABLED=True)
+class PurchaseQueueTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create_user(
+                username=f"user{number}",
+                email=f"user{number}@example.com",
+                password="testpass"
+            )
+            for number in range(5)
+        ]
+        Balance.objects.bulk_create(
+            Balance(user=user, amount=1000) for user in self.users
+        )
+        self.course = Course.objects.create(
+            author="Test Author",
+            title="Test Course",
+            start_date="2024-01-01T00:00:00Z",
+            price=100,
+            available=True,
+        )
+        self.url = reverse("courses-pay", args=[self.course.id])
+
+    def pay(self, user):
+        self.client.force_authenticate(user=user)
+        return self.client.post(self.url)
+
+    def process(self):
+        out = StringIO()
+        call_command("process_purchases", "--once", stdout=out)
+        return out.getvalue()
+
+    def test_pay_is_accepted_and_processed_in_batch(self):
+        for user in self.users:
+            response = self.pay(user)
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(response.data["purchase"]["status"], Purchase.PENDING)
+        self.assertFalse(Subscription.objects.exists())
+        self.assertEqual(Balance.objects.get(user=self.users[0]).amount, 900)
+
+        self.assertIn("Purchases processed: 5", self.process())
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.students_count, 5)
+        counts = list(self.course.groups.values_list("student_count", flat=True))
+        self.assertEqual(sum(counts), 5)
+        self.assertLessEqual(max(counts) - min(counts), 1)
+
+        response = self.client.get(response["Location"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], Purchase.COMPLETED)
+
+    def test_second_pay_is_rejected(self):
+        self.pay(self.users[0])
+        response = self.pay(self.users[0])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Balance.objects.get(user=self.users[0]).amount, 900)
+
+    def test_pay_again_after_subscription_is_deleted(self):
+        user = self.users[0]
+        self.pay(user)
+        self.process()
+        Subscription.objects.get(user=user).delete()
+
+        response = self.pay(user)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.process()
+        self.assertEqual(
+            list(Purchase.objects.values_list("status", flat=True)),
+            [Purchase.COMPLETED, Purchase.COMPLETED],
+        )
+        self.assertEqual(Balance.objects.get(user=user).amount, 800)
+        self.assertTrue(Subscription.objects.filter(user=user).exists())
+
+    def test_course_bought_elsewhere_is_refunded(self):
+        user = self.users[0]
+        self.pay(user)
+        purchase_course(user, self.course)
+        self.process()
+        purchase = Purchase.objects.get(user=user)
+        self.assertEqual(purchase.status, Purchase.FAILED)
+        self.assertEqual(Balance.objects.get(user=user).amount, 900)
+        self.assertEqual(Subscription.objects.filter(user=user).count(), 1)
+
+    def test_course_bought_during_processing_is_refunded(self):
+        for user in self.users[:3]:
+            self.pay(user)
+        purchase_course(self.users[1], self.course)
+        # Подписка появилась после проверки обработчиком.
+        with patch(
+            "users.purchases._subscribed",
+            side_effect=[set(), {(self.users[1].pk, self.course.pk)}],
+        ):
+            self.assertIn("Purchases processed: 3", self.process())
+        self.assertEqual(
+            dict(Purchase.objects.values_list("user_id", "status")),
+            {
+                self.users[0].pk: Purchase.COMPLETED,
+                self.users[1].pk: Purchase.FAILED,
+                self.users[2].pk: Purchase.COMPLETED,
+            },
+        )
+        self.assertEqual(Balance.objects.get(user=self.users[1]).amount, 900)
+        self.assertEqual(Subscription.objects.count(), 3)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.students_count, 3)
+
+    def test_course_closed_in_queue_is_refunded(self):
+        user = self.users[0]
+        self.pay(user)
+        Course.objects.filter(pk=self.course.pk).update(available=False)
+        self.process()
+        purchase = Purchase.objects.get(user=user)
+        self.assertEqual(purchase.status, Purchase.FAILED)
+        self.assertIn("not available", purchase.error)
+        self.assertEqual(Balance.objects.get(user=user).amount, 1000)
+        self.assertFalse(Subscription.objects.exists())
+
+    def test_status_of_other_users_purchase_is_hidden(self):
+        purchase_id = self.pay(self.users[0]).data["purchase"]["id"]
+        self.client.force_authenticate(user=self.users[1])
+        response = self.client.get(reverse("purchases-detail", args=[purchase_id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class DuplicateSubscriptionMigrationTest(TransactionTestCase):
+    before = [
+        ("courses", "0002_initial"),
+        ("users", "0002_available_catalog_indexes"),
+    ]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_duplicates_are_removed_and_refunded(self):
+        old_apps = self.migrate(self.before)
+        user = old_apps.get_model("users", "CustomUser").objects.create(
+            username="testuser", email="testuser@example.com"
+        )
+        old_apps.get_model("users", "Balance").objects.create(
+            user=user, amount=500
+        )
+        course = old_apps.get_model("courses", "Course").objects.create(
+            author="Test Author",
+            title="Test Course",
+            start_date="2024-01-01T00:00:00Z",
+            price=100,
+        )
+        Subscription = old_apps.get_model("users", "Subscription")
+        first = Subscription.objects.create(user=user, course=course)
+        Subscription.objects.create(user=user, course=course)
+        Subscription.objects.create(user=user, course=course)
+
+        with self.assertLogs("users.migrations", "WARNING") as logs:
+            self.migrate([("users", "0003_unique_subscription")])
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(
+            list(Subscription.objects.values_list("pk", flat=True)), [first.pk]
+        )
+        self.assertEqual(
+            old_apps.get_model("users", "Balance").objects.get().amount, 700
+        )
+
+
+class PaymentConcurrencyTest(TransactionTestCase):
+    threads = 20
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass"
+        )
+        Balance.objects.create(user=self.user, amount=1000)
+        self.courses = [
+            Course.objects.create(
+                author="Test Author",
+                title=f"Test Course {number}",
+                start_date="2024-01-01T00:00:00Z",
+                price=100,
+                available=True,
+            )
+            for number in range(self.threads)
+        ]
+
+    def purchase(self, course):
+        try:
+            purchase_course(self.user, course)
+            return True
+        except ValidationError:
+            return False
+        finally:
+            connection.close()
+
+    def run_concurrently(self, courses):
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            return list(executor.map(self.purchase, courses))
+
+    def test_concurrent_purchases_never_overdraw(self):
+        results = self.run_concurrently(self.courses)
+        self.assertEqual(results.count(True), 10)
+        self.assertEqual(Balance.objects.get(user=self.user).amount, 0)
+        self.assertEqual(Subscription.objects.count(), 10)
+
+    def test_concurrent_purchases_of_one_course(self):
+        results = self.run_concurrently([self.courses[0]] * self.threads)
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(Balance.objects.get(user=self.user).amount, 900)
+        self.assertEqual(Subscription.objects.count(), 1)
+
+
+class SQLiteProfileTest(TestCase):
+    def test_production_options_are_applied(self):
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper({
+                **connection.settings_dict,
+                "NAME": os.path.join(directory, "profile.sqlite3"),
+                "OPTIONS": {
+                    "transaction_mode": "IMMEDIATE",
+                    "pragmas": {"journal_mode": "WAL", "synchronous": "NORMAL"},
+                },
+            })
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    self.assertEqual(cursor.fetchone()[0], "wal")
+                    cursor.execute("PRAGMA synchronous")
+                    self.assertEqual(cursor.fetchone()[0], 1)
+                with CaptureQueriesContext(wrapper) as queries:
+                    wrapper._start_transaction_under_autocommit()
+                self.assertEqual(queries[0]["sql"], "BEGIN IMMEDIATE")
+            finally:
+                wrapper.close()
+
+    def test_retry_on_lock(self):
+        attempts = []
+
+        @retry_on_lock
+        def write():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise OperationalError("database is locked")
+            return "done"
+
+        with transaction.atomic():
+            with self.assertRaises(OperationalError):
+                write()
+        attempts.clear()
+        with patch.object(connection, "in_atomic_block", False):
+            self.assertEqual(write(), "done")
+        self.assertEqual(len(attempts), 3)
+
+
+class CopyDatabaseTest(TestCase):
+    databases = {"default", "target"}
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass"
+        )
+        Balance.objects.create(user=self.user, amount=1000)
+        self.course = Course.objects.create(
+            author="Test Author",
+            title="Test Course",
+            start_date="2024-01-01T00:00:00Z",
+            price=100,
+            available=True,
+        )
+        Lesson.objects.create(
+            title="Lesson", link="https://example.com/", course=self.course
+        )
+        purchase_course(self.user, self.course)
+
+    def copy(self, *args):
+        call_command(
+            "copy_database", "--no-migrate", "--chunk-size", "2", *args,
+            stdout=StringIO(),
+        )
+
+    def test_copy_database(self):
+        self.copy()
+        course = Course.objects.using("target").get()
+        self.course.refresh_from_db()
+        self.assertEqual(course.title, "Test Course")
+        self.assertEqual(course.updated_at, self.course.updated_at)
+        self.assertEqual(course.students_count, 1)
+        self.assertEqual(
+            Balance.objects.using("target").get(user=self.user).amount, 900
+        )
+        self.assertEqual(
+            Group.students.through.objects.using("target").count(), 1
+        )
+        self.assertEqual(
+            BalanceTransaction.objects.using("target").count(), 2
+        )
+
+    def test_copy_database_incremental(self):
+        self.copy()
+        other = Course.objects.create(
+            author="Test Author",
+            title="Other Course",
+            start_date="2024-01-01T00:00:00Z",
+            price=50,
+            available=True,
+        )
+        purchase_course(self.user, other)
+        self.course.title = "Renamed"
+        self.course.save()
+        with self.assertRaises(CommandError):
+            self.copy()
+        self.copy("--incremental")
+        self.assertEqual(
+            Course.objects.using("target").get(pk=self.course.pk).title,
+            "Renamed",
+        )
+        self.assertEqual(
+            Balance.objects.using("target").get(user=self.user).amount, 850
+        )
+        self.assertEqual(Subscription.objects.using("target").count(), 2)
+
+    def test_incremental_copies_deletes_and_rows_without_updated_at(self):
+        self.copy()
+        group = Group.objects.get(students=self.user)
+        # Как при rebalance_groups: связь удаляется и создается заново.
+        group.students.remove(self.user)
+        group.students.add(self.user)
+        self.user.first_name = "Иван"
+        self.user.save()
+        Lesson.objects.all().delete()
+        self.copy("--incremental")
+
+        self.assertEqual(
+            User.objects.using("target").get(pk=self.user.pk).first_name,
+            "Иван",
+        )
+        self.assertFalse(Lesson.objects.using("target").exists())
+        self.assertEqual(
+            list(Group.students.through.objects.using("target").values_list(
+                "pk", flat=True
+            )),
+            list(Group.students.through.objects.values_list("pk", flat=True)),
+        )
+
+    def test_data_migrations_write_to_migrated_database(self):
+        self.copy()
+        ledger = import_module("users.migrations.0004_balance_ledger")
+        start_migration(sender=None, using="target")
+        try:
+            ledger.open_ledger(django_apps, schema_editor=None)
+        finally:
+            finish_migration(sender=None, using="target")
+        self.assertEqual(BalanceTransaction.objects.count(), 2)
+        self.assertEqual(
+            BalanceTransaction.objects.using("target").count(), 3
+        )
+
+
+class CourseCatalogQueriesTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def create_course(self, number):
+        course = Course.objects.create(
+            author="Test Author",
+            title=f"Test Course {number}",
+            start_date="2024-01-01T00:00:00Z",
+            price=100,
+            available=True,
+        )
+        for lesson in range(3):
+            Lesson.objects.create(
+                title=f"Lesson {lesson}",
+                link="https://example.com/",
+                course=course,
+            )
+        Group.objects.create(title="Group", course=course)
+        Group.objects.create(title="Group", course=course)
+        Subscription.objects.create(user=self.user, course=course)
+        return course
+
+    def test_list_courses_statistics(self):
+        self.create_course(1)
+        User.objects.create_user(
+            username="other",
+            email="other@example.com",
+            password="testpass"
+        )
+        response = self.client.get(reverse("courses-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        course = response.data["results"][0]
+        self.assertEqual(course["lessons_count"], 3)
+        self.assertEqual(len(course["lessons"]), 3)
+        self.assertEqual(course["students_count"], 1)
+        self.assertEqual(course["demand_course_percent"], 50)
+        self.assertAlmostEqual(course["groups_filled_percent"], 100 / 60)
+
+    def test_list_courses_constant_queries(self):
+        self.create_course(1)
+        with self.assertNumQueries(5):
+            self.client.get(reverse("courses-list"))
+        for number in range(2, 22):
+            self.create_course(number)
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("courses-list"))
+        self.assertEqual(len(response.data["results"]), 21)
+
+    def test_statistics_are_served_from_cache(self):
+        course = self.create_course(1)
+        self.client.get(reverse("courses-list"))
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("courses-list"))
+        self.assertEqual(response.data["results"][0]["students_count"], 1)
+
+        other = User.objects.create_user(
+            username="other",
+            email="other@example.com",
+            password="testpass"
+        )
+        Subscription.objects.create(user=other, course=course)
+        response = self.client.get(reverse("courses-list"))
+        statistics = response.data["results"][0]
+        self.assertEqual(statistics["students_count"], 2)
+        self.assertAlmostEqual(statistics["groups_filled_percent"], 100 / 30)
+
+        info = statistics_cache_info()
+        self.assertGreater(info["hits"], 0)
+        self.assertGreater(info["misses"], 0)
+
+
+class AvailableCoursesTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.bought, self.hidden, self.on_sale = (
+            Course.objects.create(
+                author="Test Author",
+                title=title,
+                start_date="2024-01-01T00:00:00Z",
+                price=100,
+                available=available,
+            )
+            for title, available in (
+                ("Bought", True), ("Hidden", False), ("On sale", True)
+            )
+        )
+        Lesson.objects.create(
+            title="Lesson", link="https://example.com/", course=self.on_sale
+        )
+        Subscription.objects.create(user=self.user, course=self.bought)
+
+    def test_list_available_courses(self):
+        response = self.client.get(reverse("courses-available"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [course["id"] for course in response.data["results"]],
+            [self.on_sale.id],
+        )
+        self.assertEqual(response.data["results"][0]["lessons_count"], 1)
+
+    def test_available_courses_require_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(reverse("courses-available"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BulkCreditTest(APITestCase):
+    url = "/api/v1/balances/bulk-credit/"
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username="testadmin",
+            email="testadmin@example.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(user=self.admin_user)
+        self.users = User.objects.bulk_create(
+            User(username=f"user{number}", email=f"user{number}@example.com")
+            for number in range(600)
+        )
+        Balance.objects.bulk_create(
+            Balance(user=user, amount=1000) for user in self.users
+        )
+
+    def test_bulk_credit_json(self):
+        data = [
+            {"email": user.email, "amount": "50.00"} for user in self.users
+        ]
+        data.append({"email": "user0@example.com", "amount": "25"})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["credited"], 600)
+        self.assertLess(len(queries), 15)
+        self.assertEqual(Balance.objects.get(user=self.users[0]).amount, 1075)
+        self.assertEqual(Balance.objects.get(user=self.users[1]).amount, 1050)
+        self.assertEqual(
+            BalanceTransaction.objects.filter(
+                kind=BalanceTransaction.CREDIT
+            ).count(),
+            600,
+        )
+
+    def test_bulk_credit_csv(self):
+        upload = SimpleUploadedFile(
+            "credits.csv",
+            b"email,amount\nuser1@example.com,10\nuser2@example.com,20\n",
+            content_type="text/csv",
+        )
+        response = self.client.post(
+            self.url, {"file": upload}, format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Balance.objects.get(user=self.users[2]).amount, 1020)
+
+    def test_unknown_email_rolls_back(self):
+        data = [
+            {"email": "user1@example.com", "amount": "10"},
+            {"email": "missing@example.com", "amount": "10"},
+        ]
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Balance.objects.get(user=self.users[1]).amount, 1000)
+
+    def test_bulk_credit_requires_staff(self):
+        self.client.force_authenticate(user=self.users[0])
+        response = self.client.post(self.url, [], format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ListPaginationTest(APITestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username="testadmin",
+            email="testadmin@example.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(user=self.admin_user)
+        self.course = Course.objects.create(
+            author="Test Author",
+            title="Test Course",
+            start_date="2024-01-01T00:00:00Z",
+            price=100,
+            available=True,
+        )
+        Lesson.objects.bulk_create(
+            Lesson(
+                title=f"Lesson {number}",
+                link="https://example.com/",
+                course=self.course,
+            )
+            for number in range(5)
+        )
+
+    def test_lessons_are_paginated_by_cursor(self):
+        url = reverse("lessons-list", args=[self.course.id])
+        response = self.client.get(url, {"page_size": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [lesson["title"] for lesson in response.data["results"]]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            titles += [lesson["title"] for lesson in response.data["results"]]
+        self.assertEqual(titles, [f"Lesson {number}" for number in range(5)])
+
+    def test_sparse_fields(self):
+        response = self.client.get(
+            reverse("courses-list"), {"fields": "id,title"}
+        )
+        self.assertEqual(
+            response.data["results"],
+            [{"id": self.course.id, "title": "Test Course"}],
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                reverse("lessons-list", args=[self.course.id]),
+                {"fields": "title"},
+            )
+        lessons_query = queries.captured_queries[-1]["sql"]
+        self.assertNotIn('"courses_lesson"."link"', lessons_query)
+
+    def test_sparse_fields_skip_unused_queries(self):
+        with self.assertNumQueries(2):
+            self.client.get(reverse("courses-list"), {"fields": "id,title"})
+
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(
+            author="Test Author",
+            title="Test Course",
+            start_date="2024-01-01T00:00:00Z",
+            price=100,
+            available=True,
+        )
+        self.lesson = Lesson.objects.create(
+            title="Lesson", link="https://example.com/", course=self.course
+        )
+
+    def assert_revalidation(self, url, change):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_course_catalog_revalidation(self):
+        self.assert_revalidation(
+            reverse("courses-list"),
+            lambda: Subscription.objects.create(
+                user=self.user, course=self.course
+            ),
+        )
+
+    def test_catalog_validator_does_not_count_large_tables(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("courses-list"), HTTP_IF_NONE_MATCH='"x"')
+        validator = queries[0]["sql"]
+        self.assertNotIn("users_subscription", validator)
+
+    def test_user_deletion_changes_catalog_etag(self):
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="testpass"
+        )
+        User.objects.create_user(
+            username="last", email="last@example.com", password="testpass"
+        )
+        self.assert_revalidation(reverse("courses-list"), other.delete)
+
+    def test_group_deletion_changes_catalog_etag(self):
+        group = Group.objects.create(title="Группа №1", course=self.course)
+        self.assert_revalidation(reverse("courses-list"), group.delete)
+
+    def test_lessons_revalidation(self):
+        Subscription.objects.create(user=self.user, course=self.course)
+
+        def rename():
+            self.lesson.title = "Renamed"
+            self.lesson.save()
+
+        self.assert_revalidation(
+            reverse("lessons-list", args=[self.course.id]), rename
+        )
+
+    def test_lesson_deletion_changes_etag(self):
+        Subscription.objects.create(user=self.user, course=self.course)
+        self.assert_revalidation(
+            reverse("lessons-list", args=[self.course.id]),
+            self.lesson.delete,
+        )
+
+
+@override_settings(API_METRICS_ENABLED=True)
+class QueryMetricsTest(APITestCase):
+    def setUp(self):
+        route_metrics.reset()
+        self.admin = User.objects.create_superuser(
+            username="admin",
+            email="admin@example.com",
+            password="testpass"
+        )
+        for number in range(3):
+            Course.objects.create(
+                author="Test Author",
+                title=f"Test Course {number}",
+                start_date="2024-01-01T00:00:00Z",
+                price=100,
+                available=True,
+            )
+        self.client.force_authenticate(user=self.admin)
+
+    def test_server_timing_header(self):
+        with self.assertLogs("api.metrics", level="INFO") as logs:
+            response = self.client.get(reverse("courses-list"))
+        timing = response["Server-Timing"]
+        for metric in ("db;dur=", "app;dur=", "render;dur=", "total;dur="):
+            self.assertIn(metric, timing)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line["route"], "GET /api/v1/courses/")
+        self.assertGreater(line["queries"], 0)
+        self.assertIn(f'desc="{line["queries"]} queries"', timing)
+
+    def test_route_percentiles(self):
+        with self.assertLogs("api.metrics", level="INFO"):
+            for _ in range(3):
+                self.client.get(reverse("courses-list"))
+            response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        route = response.data["routes"]["GET /api/v1/courses/"]
+        self.assertEqual(route["requests"], 3)
+        self.assertLessEqual(route["p50_ms"], route["p99_ms"])
+        self.assertIn("statistics_cache", response.data)
+
+    def test_metrics_staff_only(self):
+        user = User.objects.create_user(
+            username="student",
+            email="student@example.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(user=user)
+        with self.assertLogs("api.metrics", level="INFO"):
+            response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BenchmarkBudgetTest(TestCase):
+    def test_scenarios_within_query_budget(self):
+        counts = seed(
+            users=30, courses=12, lessons_per_course=5, subscriptions_per_user=3
+        )
+        self.assertEqual(counts["subscriptions"], 90)
+        self.assertEqual(Subscription.objects.count(), 90)
+        self.assertEqual(
+            sum(Group.objects.values_list("student_count", flat=True)), 90
+        )
+        for result in scenarios.run(repeat=3):
+            self.assertTrue(result["within_budget"], result)
+
+
+class AsyncReadViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.courses = []
+        for number in range(3):
+            course = Course.objects.create(
+                author="Test Author",
+                title=f"Test Course {number}",
+                start_date="2024-01-01T00:00:00Z",
+                price=100,
+                available=True,
+            )
+            for lesson in range(2):
+                Lesson.objects.create(
+                    title=f"Lesson {lesson}",
+                    link="https://example.com/",
+                    course=course,
+                )
+            self.courses.append(course)
+        Subscription.objects.create(user=self.user, course=self.courses[0])
+
+    def test_course_list_matches_sync_view(self):
+        self.client.force_login(self.user)
+        expected = self.client.get(reverse("courses-list")).json()["results"]
+        response = self.client.get(reverse("async-courses"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"], expected)
+
+    def test_anonymous_catalog_matches_sync_view(self):
+        expected = self.client.get(reverse("courses-list")).json()["results"]
+        response = self.client.get(reverse("async-courses"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"], expected)
+        response = self.client.get(
+            reverse("async-courses"), HTTP_AUTHORIZATION="Token invalid"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_token_authentication_and_pagination(self):
+        headers = {"AUTHORIZATION": f"Token {self.token.key}"}
+        first = await self.async_client.get(
+            reverse("async-courses"), {"page_size": 2}, headers=headers
+        )
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [course["id"] for course in first.json()["results"]],
+            [self.courses[2].id, self.courses[1].id],
+        )
+        second = await self.async_client.get(
+            first.json()["next"], headers=headers
+        )
+        self.assertEqual(
+            [course["id"] for course in second.json()["results"]],
+            [self.courses[0].id],
+        )
+        self.assertIsNone(second.json()["next"])
+
+    async def test_lesson_list(self):
+        headers = {"AUTHORIZATION": f"Token {self.token.key}"}
+        url = reverse("async-lessons", args=[self.courses[0].id])
+        response = await self.async_client.get(url, headers=headers)
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {
+                    "title": f"Lesson {lesson}",
+                    "link": "https://example.com/",
+                    "course": "Test Course 0",
+                }
+                for lesson in range(2)
+            ],
+        )
+        foreign = await self.async_client.get(
+            reverse("async-lessons", args=[self.courses[1].id]), headers=headers
+        )
+        self.assertEqual(foreign.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_anonymous_lessons_are_rejected(self):
+        response = await self.async_client.get(
+            reverse("async-lessons", args=[self.courses[0].id])
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class StreamingExportTest(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username="admin",
+            email="admin@example.com",
+            password="testpass"
+        )
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass"
+        )
+        Balance.objects.create(user=self.user, amount=500)
+        self.course = Course.objects.create(
+            author="Test Author",
+            title="Test Course",
+            start_date="2024-01-01T00:00:00Z",
+            price=100,
+            available=True,
+        )
+        Subscription.objects.create(user=self.user, course=self.course)
+        self.client.force_authenticate(user=self.admin)
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_subscriptions_ndjson(self):
+        response = self.client.get(reverse("exports-subscriptions"))
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["email"], "testuser@example.com")
+        self.assertEqual(rows[0]["course_title"], "Test Course")
+
+    def test_rosters_csv(self):
+        response = self.client.get(
+            reverse("exports-rosters"), {"type": "csv", "course": self.course.id}
+        )
+        lines = self.read(response).splitlines()
+        self.assertEqual(lines[0].split(",")[:2], ["course_id", "course_title"])
+        self.assertEqual(len(lines), 2)
+        self.assertIn("testuser@example.com", lines[1])
+
+    def test_balances_and_validation(self):
+        response = self.client.get(reverse("exports-balances"), {"type": "csv"})
+        self.assertIn(f"{self.user.id},testuser@example.com,500.00",
+                      self.read(response))
+        response = self.client.get(reverse("exports-balances"), {"type": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse("exports-subscriptions"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SearchTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            username="admin",
+            email="admin@example.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.python = Course.objects.create(
+            author="Иванов",
+            title="Основы Python",
+            start_date="2024-01-01T00:00:00Z",
+            price=100,
+        )
+        self.django = Course.objects.create(
+            author="Python Software",
+            title="Django для начинающих",
+            start_date="2024-01-01T00:00:00Z",
+            price=100,
+        )
+        Lesson.objects.bulk_create(
+            [
+                Lesson(
+                    title="Установка Python",
+                    link="https://example.com/",
+                    course=self.python,
+                ),
+                Lesson(
+                    title="Модели Django",
+                    link="https://example.com/",
+                    course=self.django,
+                ),
+            ]
+        )
+
+    def search(self, query):
+        response = self.client.get(reverse("search"), {"q": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_ranked_prefix_search(self):
+        data = self.search("pyth")
+        self.assertEqual(
+            [course["id"] for course in data["courses"]],
+            [self.python.id, self.django.id],
+        )
+        self.assertEqual(len(data["lessons"]), 1)
+        self.assertEqual(data["lessons"][0]["course_title"], "Основы Python")
+        self.assertEqual(
+            [course["id"] for course in self.search("ОСН pyth")["courses"]],
+            [self.python.id],
+        )
+        self.assertEqual(self.search("!!!"), {"courses": [], "lessons": []})
+
+    def test_index_follows_changes(self):
+        self.python.title = "Основы Go"
+        self.python.save()
+        Lesson.objects.filter(course=self.django).update(title="Шаблоны")
+        self.assertEqual(
+            [course["id"] for course in self.search("pyth")["courses"]],
+            [self.django.id],
+        )
+        self.assertEqual(len(self.search("шабл")["lessons"]), 1)
+        self.django.delete()
+        self.assertEqual(self.search("шабл")["lessons"], [])
+
+    def test_admin_search_uses_index(self):
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("admin:courses_course_changelist"), {"q": "иван"}
+        )
+        self.assertEqual(list(response.context["cl"].result_list), [self.python])
+        response = self.client.get(
+            reverse("admin:courses_lesson_changelist"), {"q": "основы"}
+        )
+        self.assertEqual(
+            [lesson.title for lesson in response.context["cl"].result_list],
+            ["Установка Python"],
+        )
+
+    def test_lessons_only_from_purchased_courses(self):
+        student = User.objects.create_user(
+            username="student", email="student@example.com", password="testpass"
+        )
+        Balance.objects.create(user=student, amount=1000)
+        self.client.force_authenticate(user=student)
+        data = self.search("python")
+        self.assertEqual(len(data["courses"]), 2)
+        self.assertEqual(data["lessons"], [])
+
+        purchase_course(student, self.django)
+        for indexed in (True, False):
+            with patch("courses.search.uses_index", return_value=indexed):
+                lessons = self.search("Модели")["lessons"]
+                self.assertEqual(
+                    [lesson["course_title"] for lesson in lessons],
+                    ["Django для начинающих"],
+                )
+                self.assertEqual(self.search("Установка")["lessons"], [])
+
+    def test_lost_triggers_are_reported_and_rebuilt(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER courses_course_fts_au")
+        warnings = search_index_check(None, databases=["default"])
+        self.assertEqual([warning.id for warning in warnings], ["courses.W001"])
+        self.python.title = "Основы Go"
+        self.python.save()
+
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(search_index_check(None, databases=["default"]), [])
+        self.assertEqual(
+            [course["id"] for course in self.search("pyth")["courses"]],
+            [self.django.id],
+        )
+
+
+class MyCoursesTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass"
+        )
+        Balance.objects.create(user=self.user, amount=1000)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("users-me-courses")
+
+    def create_course(self, number, lessons=2):
+        course = Course.objects.create(
+            author="Test Author",
+            title=f"Test Course {number}",
+            start_date="2024-01-01T00:00:00Z",
+            price=100,
+            available=True,
+        )
+        for lesson in range(lessons):
+            Lesson.objects.create(
+                title=f"Lesson {lesson}",
+                link="https://example.com/",
+                course=course,
+            )
+        return course
+
+    def test_courses_with_group_and_lessons(self):
+        course = self.create_course(1)
+        self.create_course(2)
+        purchase_course(self.user, course)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        item = response.data[0]
+        self.assertEqual(item["course"]["id"], course.id)
+        self.assertEqual(
+            item["group"]["id"],
+            self.user.course_groups.get(course=course).id,
+        )
+        self.assertEqual(
+            [lesson["title"] for lesson in item["lessons"]],
+            ["Lesson 0", "Lesson 1"],
+        )
+
+    def test_fixed_queries_and_cache(self):
+        for number in range(3):
+            purchase_course(self.user, self.create_course(number))
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 3)
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "students": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "students",
+            },
+        },
+        STUDENT_COURSES_CACHE="students",
+    )
+    def test_configured_cache_alias(self):
+        purchase_course(self.user, self.create_course(1))
+        self.client.get(self.url)
+        key = f"student-courses:{self.user.pk}"
+        self.assertIsNone(cache.get(key))
+        self.assertIsNotNone(caches["students"].get(key))
+
+    def test_invalidation(self):
+        course = self.create_course(1)
+        purchase_course(self.user, course)
+        self.client.get(self.url)
+
+        other = self.create_course(2)
+        self.client.post(
+            reverse("checkout-list"), {"course_ids": [other.id]}, format="json"
+        )
+        self.assertEqual(len(self.client.get(self.url).data), 2)
+
+        Lesson.objects.create(
+            title="Lesson 2", link="https://example.com/", course=course
+        )
+        response = self.client.get(self.url)
+        lessons = {item["course"]["id"]: item["lessons"] for item in response.data}
+        self.assertEqual(len(lessons[course.id]), 3)
+
+        group = self.user.course_groups.get(course=course)
+        group.students.remove(self.user)
+        response = self.client.get(self.url)
+        groups = {item["course"]["id"]: item["group"] for item in response.data}
+        self.assertIsNone(groups[course.id])
+
+    def test_anonymous_is_rejected(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class LessonEntitlementTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass"
+        )
+        Balance.objects.create(user=self.user, amount=1000)
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(
+            author="Test Author",
+            title="Test Course",
+            start_date="2024-01-01T00:00:00Z",
+            price=100,
+            available=True,
+        )
+        self.lesson = Lesson.objects.create(
+            title="Lesson", link="https://example.com/", course=self.course
+        )
+        self.list_url = reverse("lessons-list", args=[self.course.id])
+        self.detail_url = reverse(
+            "lessons-detail", args=[self.course.id, self.lesson.id]
+        )
+
+    def test_lessons_require_purchase(self):
+        self.assertEqual(
+            self.client.get(self.list_url).status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+        self.client.post(reverse("courses-pay", args=[self.course.id]))
+        self.assertEqual(
+            self.client.get(self.list_url).status_code, status.HTTP_200_OK
+        )
+        self.assertEqual(
+            self.client.get(self.detail_url).status_code, status.HTTP_200_OK
+        )
+
+    def test_access_check_uses_cached_set(self):
+        purchase_course(self.user, self.course)
+        self.client.get(self.detail_url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.detail_url)
+        self.assertFalse(
+            any("users_subscription" in query["sql"] for query in queries)
+        )
+
+    def test_staff_reads_any_course(self):
+        admin = User.objects.create_superuser(
+            username="admin",
+            email="admin@example.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(user=admin)
+        self.assertEqual(
+            self.client.get(self.detail_url).status_code, status.HTTP_200_OK
+        )
+
+
+class TokenCacheTest(APITestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpass"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.url = reverse("courses-list")
+
+    def test_token_lookup_is_cached(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(
+            any("authtoken_token" in query["sql"] for query in queries)
+        )
+        self.assertEqual(token_cache.info()["hits"], 1)
+
+    def test_logout_evicts_token(self):
+        self.client.get(self.url)
+        response = self.client.post("/api/v1/auth/token/logout/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            self.client.get(self.url).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+    def test_deactivation_evicts_user(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(
+            self.client.get(self.url).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+    def test_cache_is_bounded(self):
+        cache = type(token_cache)(maxsize=2, ttl=60)
+        for key in ("a", "b", "c"):
+            cache.set(key, self.user, None)
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        cache.evict_users(self.user.pk)
+        self.assertEqual(cache.info()["size"], 0)
+
 
 class CustomUserSerializerTest(APITestCase):
     def test_user_serialization(self):